@@ -0,0 +1,217 @@
+"""Compare JSON codecs on payloads shaped like Falcon API responses.
+
+Usage:
+    python benchmarks/codec_benchmark.py [--hosts 5000] [--repeat 5]
+
+Measures the code paths the server uses on a page of full device records
+(as returned by /devices/entities/devices/v2) and a page of detection
+summaries: src.codec.loads and src.codec.dumps with each available backend
+(the stdlib json module and, if installed, orjson), the gateway's response
+for a decoded result (decode, then render through CodecJSONResponse) and
+its passthrough of an undecoded RawResponse.
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import Response  # noqa: E402
+
+from src import codec  # noqa: E402
+from src.client import RawResponse  # noqa: E402
+from src.http_gateway import CodecJSONResponse  # noqa: E402
+
+
+def _token(rng: random.Random, length: int = 32) -> str:
+    return "".join(rng.choice(string.hexdigits.lower()) for _ in range(length))
+
+
+def make_device(rng: random.Random) -> Dict[str, Any]:
+    """Build a device record with the fields and nesting of a real one."""
+    device_id = _token(rng)
+    return {
+        "device_id": device_id,
+        "cid": _token(rng),
+        "agent_load_flags": "0",
+        "agent_local_time": "2024-05-01T12:00:00.000Z",
+        "agent_version": f"7.{rng.randint(10, 16)}.{rng.randint(10000, 19999)}.0",
+        "bios_manufacturer": rng.choice(["Dell Inc.", "LENOVO", "HP", "VMware, Inc."]),
+        "bios_version": f"{rng.randint(1, 3)}.{rng.randint(0, 30)}.{rng.randint(0, 9)}",
+        "config_id_base": str(rng.randint(10 ** 8, 10 ** 9)),
+        "config_id_build": str(rng.randint(10000, 19999)),
+        "config_id_platform": "3",
+        "external_ip": f"203.0.113.{rng.randint(1, 254)}",
+        "mac_address": "-".join(f"{rng.randint(0, 255):02x}" for _ in range(6)),
+        "hostname": f"host-{device_id[:8]}",
+        "first_seen": "2023-01-15T08:30:00Z",
+        "last_seen": "2024-05-01T11:59:00Z",
+        "local_ip": f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+        "machine_domain": "corp.example.com",
+        "major_version": "10",
+        "minor_version": "0",
+        "os_version": rng.choice(["Windows 10", "Windows 11", "Windows Server 2019", "Ubuntu 22.04"]),
+        "platform_id": "0",
+        "platform_name": rng.choice(["Windows", "Mac", "Linux"]),
+        "policies": [
+            {
+                "policy_type": "prevention",
+                "policy_id": _token(rng),
+                "applied": True,
+                "settings_hash": _token(rng, 8),
+                "assigned_date": "2024-04-01T00:00:00.000Z",
+                "applied_date": "2024-04-01T00:05:00.000Z",
+            }
+        ],
+        "device_policies": {
+            name: {
+                "policy_type": name,
+                "policy_id": _token(rng),
+                "applied": True,
+                "settings_hash": _token(rng, 8),
+                "assigned_date": "2024-04-01T00:00:00.000Z",
+                "applied_date": "2024-04-01T00:05:00.000Z",
+            }
+            for name in ("prevention", "sensor_update", "device_control", "global_config", "remote_response")
+        },
+        "groups": [_token(rng) for _ in range(rng.randint(0, 4))],
+        "group_hash": _token(rng, 64),
+        "product_type_desc": rng.choice(["Workstation", "Server"]),
+        "provision_status": "Provisioned",
+        "serial_number": _token(rng, 12).upper(),
+        "status": rng.choice(["normal", "normal", "normal", "contained"]),
+        "system_manufacturer": "Dell Inc.",
+        "system_product_name": "Latitude 7420",
+        "tags": [f"SensorGroupingTags/{rng.choice(['prod', 'dev', 'lab'])}"],
+        "modified_timestamp": "2024-05-01T11:59:30Z",
+        "meta": {"version": str(rng.randint(1, 5000))},
+        "kernel_version": "10.0.19045.4291",
+        "os_build": "19045",
+        "chassis_type": "10",
+        "chassis_type_desc": "Notebook",
+    }
+
+
+def make_detection(rng: random.Random) -> Dict[str, Any]:
+    """Build a detection summary with a device block and behaviors."""
+    return {
+        "detection_id": f"ldt:{_token(rng)}:{rng.randint(10 ** 9, 10 ** 10)}",
+        "cid": _token(rng),
+        "created_timestamp": "2024-05-01T10:00:00.000Z",
+        "date_updated": "2024-05-01T10:05:00Z",
+        "status": rng.choice(["new", "in_progress", "true_positive", "false_positive"]),
+        "max_severity": rng.randint(10, 100),
+        "max_severity_displayname": rng.choice(["Low", "Medium", "High", "Critical"]),
+        "show_in_ui": True,
+        "device": make_device(rng),
+        "behaviors": [
+            {
+                "behavior_id": str(rng.randint(1000, 9999)),
+                "filename": "powershell.exe",
+                "cmdline": "powershell.exe -nop -w hidden -enc " + _token(rng, 120),
+                "sha256": _token(rng, 64),
+                "md5": _token(rng),
+                "tactic": "Execution",
+                "technique": "PowerShell",
+                "severity": rng.randint(10, 100),
+                "confidence": rng.randint(10, 100),
+                "timestamp": "2024-05-01T09:59:00Z",
+                "parent_details": {
+                    "parent_sha256": _token(rng, 64),
+                    "parent_cmdline": "C:\\Windows\\explorer.exe",
+                    "parent_process_graph_id": f"pid:{_token(rng)}:{rng.randint(10 ** 9, 10 ** 10)}",
+                },
+            }
+            for _ in range(rng.randint(1, 5))
+        ],
+    }
+
+
+def make_page(resources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "meta": {"query_time": 0.0123, "powered_by": "device-api", "trace_id": "00000000-0000-0000-0000-000000000000"},
+        "resources": resources,
+        "errors": [],
+    }
+
+
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    """Return the fastest of repeat runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def backends() -> List[str]:
+    """Return the codec backends available in this environment."""
+    return ["json", "orjson"] if codec.orjson is not None else ["json"]
+
+
+def gateway_decoded(raw: bytes) -> bytes:
+    """Decode an upstream body and render it as the gateway does for a tool result."""
+    return CodecJSONResponse(content=codec.loads(raw)).body
+
+
+def gateway_passthrough(raw: bytes) -> bytes:
+    """Return an upstream body as the gateway does for a RawResponse."""
+    result = RawResponse(raw)
+    return Response(content=result.content, media_type=result.media_type, status_code=result.status_code).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=5000, help="Device records per page (default: 5000)")
+    parser.add_argument("--detections", type=int, default=1000, help="Detection summaries per page (default: 1000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the fastest is kept")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    payloads = {
+        f"devices x{args.hosts}": make_page([make_device(rng) for _ in range(args.hosts)]),
+        f"detections x{args.detections}": make_page([make_detection(rng) for _ in range(args.detections)]),
+    }
+    if codec.orjson is None:
+        print("orjson is not installed; only the stdlib codec is measured (pip install orjson)")
+
+    configured = codec.BACKEND
+    print(f"{'payload':<18} {'size':>9} {'codec':<7} {'decode ms':>10} {'encode ms':>10} {'gateway ms':>11}")
+    try:
+        for name, payload in payloads.items():
+            raw = json.dumps(payload).encode("utf-8")
+            baseline = None
+            for backend in backends():
+                # The codec picks its backend per call, so it can be switched here
+                codec.BACKEND = backend
+                decode = best_of(lambda: codec.loads(raw), args.repeat)
+                encode = best_of(lambda: codec.dumps(payload), args.repeat)
+                gateway = best_of(lambda: gateway_decoded(raw), args.repeat)
+                speedup = ""
+                if baseline is None:
+                    baseline = (decode, encode, gateway)
+                else:
+                    speedup = (
+                        f"  ({baseline[0] / decode:.1f}x / {baseline[1] / encode:.1f}x "
+                        f"/ {baseline[2] / gateway:.1f}x faster)"
+                    )
+                print(
+                    f"{name:<18} {len(raw) / 1e6:>7.1f}MB {backend:<7} "
+                    f"{decode * 1000:>10.1f} {encode * 1000:>10.1f} {gateway * 1000:>11.1f}{speedup}"
+                )
+            passthrough = best_of(lambda: gateway_passthrough(raw), args.repeat)
+            print(f"{name:<18} {len(raw) / 1e6:>7.1f}MB {'raw':<7} {'-':>10} {'-':>10} {passthrough * 1000:>11.1f}")
+    finally:
+        codec.BACKEND = configured
+
+
+if __name__ == "__main__":
+    main()
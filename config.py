@@ -3,6 +3,7 @@ import os
 from typing import Literal
 
 TransportMode = Literal["stdio", "http", "dual"]
+McpTransport = Literal["stdio", "streamable-http", "sse"]
 
 
 def get_config() -> dict:
@@ -12,6 +13,37 @@ def get_config() -> dict:
         "TRANSPORT_MODE": os.getenv("TRANSPORT_MODE", "dual").lower(),
         "HTTP_PORT": int(os.getenv("HTTP_PORT", "80")),
         "STDIO_PORT": int(os.getenv("STDIO_PORT", "8080")),
+        "MCP_TRANSPORT": os.getenv("FALCON_MCP_TRANSPORT", "stdio").lower(),
+        "MCP_PATH": os.getenv("FALCON_MCP_PATH", ""),
+        "METRICS_PORT": int(os.getenv("FALCON_METRICS_PORT", "0")),
+        "TRACING": os.getenv("FALCON_TRACING", "off").lower(),
+        "TOKEN_REFRESH_MARGIN": float(os.getenv("FALCON_TOKEN_REFRESH_MARGIN", "60")),
+        "HTTP_MAX_CONNECTIONS": int(os.getenv("FALCON_HTTP_MAX_CONNECTIONS", "100")),
+        "HTTP_MAX_KEEPALIVE_CONNECTIONS": int(os.getenv("FALCON_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        "HTTP_KEEPALIVE_EXPIRY": float(os.getenv("FALCON_HTTP_KEEPALIVE_EXPIRY", "30")),
+        "HTTP2_ENABLED": os.getenv("FALCON_HTTP2", "true").lower() in ("1", "true", "yes"),
+        "HTTP_POOL_IDLE_TIMEOUT": float(os.getenv("FALCON_HTTP_POOL_IDLE_TIMEOUT", "300")),
+        "HTTP_MAX_CLIENTS": int(os.getenv("FALCON_HTTP_MAX_CLIENTS", "1024")),
+        "MAX_CONCURRENCY": int(os.getenv("FALCON_MAX_CONCURRENCY", "8")),
+        "RATE_LIMIT_PER_MINUTE": int(os.getenv("FALCON_RATE_LIMIT_PER_MINUTE", "6000")),
+        "RATE_LIMIT_MAX_WAIT": float(os.getenv("FALCON_RATE_LIMIT_MAX_WAIT", "60")),
+        "RETRY_MAX_ATTEMPTS": int(os.getenv("FALCON_RETRY_MAX_ATTEMPTS", "3")),
+        "RETRY_BASE_DELAY": float(os.getenv("FALCON_RETRY_BASE_DELAY", "0.2")),
+        "RETRY_MAX_DELAY": float(os.getenv("FALCON_RETRY_MAX_DELAY", "5")),
+        "RETRY_DEADLINE": float(os.getenv("FALCON_RETRY_DEADLINE", "30")),
+        "CACHE_MAX_ENTRIES": int(os.getenv("FALCON_CACHE_MAX_ENTRIES", "1024")),
+        "CACHE_TTLS": os.getenv("FALCON_CACHE_TTLS", ""),
+        "BATCH_WINDOW_MS": float(os.getenv("FALCON_BATCH_WINDOW_MS", "5")),
+        "WRITE_COALESCE_MS": float(os.getenv("FALCON_WRITE_COALESCE_MS", "10")),
+        "INVENTORY_DB": os.getenv("FALCON_INVENTORY_DB", ""),
+        "INVENTORY_MAX_AGE": float(os.getenv("FALCON_INVENTORY_MAX_AGE", "300")),
+        "DETECTION_CHECKPOINT": os.getenv("FALCON_DETECTION_CHECKPOINT", "detection_checkpoints.json"),
+        "DETECTION_LOOKBACK_HOURS": float(os.getenv("FALCON_DETECTION_LOOKBACK_HOURS", "24")),
+        "JSON_CODEC": os.getenv("FALCON_JSON_CODEC", "auto").lower(),
+        "HTTP_WORKERS": int(os.getenv("FALCON_HTTP_WORKERS", "1")),
+        "SHARED_STORE": os.getenv("FALCON_SHARED_STORE", ""),
+        "BATCH_CONCURRENCY": int(os.getenv("FALCON_BATCH_CONCURRENCY", "8")),
+        "BATCH_MAX_CALLS": int(os.getenv("FALCON_BATCH_MAX_CALLS", "100")),
     }
 
 
@@ -22,3 +54,13 @@ def get_transport_mode() -> TransportMode:
         return "dual"
     return mode  # type: ignore
 
+
+
+def get_mcp_transport() -> McpTransport:
+    """Get the transport the MCP protocol is served over, defaulting to STDIO."""
+    transport = get_config()["MCP_TRANSPORT"]
+    if transport == "http":
+        return "streamable-http"
+    if transport not in ["stdio", "streamable-http", "sse"]:
+        return "stdio"
+    return transport  # type: ignore
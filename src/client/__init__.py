@@ -1,5 +1,6 @@
 """API client package for CrowdStrike Falcon."""
-from .api_client import APIClient
+from .api_client import APIClient, RawResponse
+from .pool import ClientRegistry, get_api_client, close_api_clients
 from .types import (
     Error,
     MetaInfo,
@@ -26,6 +27,10 @@ from .types import (
 
 __all__ = [
     "APIClient",
+    "RawResponse",
+    "ClientRegistry",
+    "get_api_client",
+    "close_api_clients",
     "Error",
     "MetaInfo",
     "BaseResponse",
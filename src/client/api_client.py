@@ -1,24 +1,123 @@
 """API client for CrowdStrike Falcon API."""
+import asyncio
 import httpx
 import os
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, Tuple, AsyncIterator, Union
 from config import get_config
+from .. import codec, tracing
+from ..metrics import REGISTRY
+from .auth import TokenCache, TokenKey, secret_digest
+from .cache import ResponseCache, parse_ttls, DEFAULT_TTLS
+from .ratelimit import get_rate_limiter
+from .retry import RetryPolicy, classify
+from .shared_store import get_shared_store
+from .singleflight import SingleFlight
+
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "falcon_upstream_request_duration_seconds",
+    "Upstream request latency, by method, endpoint and status (error for transport failures).",
+    ("method", "endpoint", "status"),
+)
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+    "falcon_upstream_requests_in_flight",
+    "Upstream requests awaiting a response.",
+)
+
+# Process-wide OAuth2 token cache shared by every APIClient instance, and
+# with other worker processes when FALCON_SHARED_STORE is set
+_token_cache = TokenCache(refresh_margin=get_config()["TOKEN_REFRESH_MARGIN"], store=get_shared_store())
+
+# Process-wide cache for rarely changing read endpoints
+_response_cache = ResponseCache(
+    max_entries=get_config()["CACHE_MAX_ENTRIES"],
+    ttls={**DEFAULT_TTLS, **parse_ttls(get_config()["CACHE_TTLS"])},
+    store=get_shared_store(),
+)
+
+# In-flight GETs keyed by tenant, endpoint and params
+_inflight_gets = SingleFlight("get")
+
+_retry_policy = RetryPolicy(
+    max_attempts=get_config()["RETRY_MAX_ATTEMPTS"],
+    base_delay=get_config()["RETRY_BASE_DELAY"],
+    max_delay=get_config()["RETRY_MAX_DELAY"],
+    deadline=get_config()["RETRY_DEADLINE"],
+)
+
+
+def _encode(data: Optional[Dict[str, Any]]) -> Optional[bytes]:
+    """Encode a JSON request body, or None for an empty body."""
+    return None if data is None else codec.dumps(data)
+
+
+class RawResponse:
+    """Undecoded upstream response body.
+    
+    Returned by the ``*_raw`` methods so callers that only forward the
+    response (such as the HTTP gateway) can send the upstream bytes as-is
+    instead of decoding and re-encoding them.
+    """
+    
+    def __init__(self, content: bytes, media_type: str = "application/json", status_code: int = 200):
+        self.content = content
+        self.media_type = media_type
+        self.status_code = status_code
+    
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "RawResponse":
+        media_type = response.headers.get("content-type", "application/json")
+        return cls(response.content, media_type, response.status_code)
+    
+    def json(self) -> Dict[str, Any]:
+        """Decode the body."""
+        return codec.loads(self.content)
+
+
+def split_api_key(api_key: str) -> Tuple[str, str]:
+    """Split an API key into client_id and client_secret (see APIClient._get_credentials)."""
+    # Handle API key format - could be "client_id:client_secret" or just "client_id"
+    if ":" in api_key:
+        client_id, client_secret = api_key.split(":", 1)
+    else:
+        client_id = api_key
+        # Try to get client_secret from environment or use api_key as fallback
+        client_secret = os.getenv("FALCON_CLIENT_SECRET", api_key)
+    return client_id, client_secret
+
+
+def credential_key(api_key: str, tenant_id: Optional[str], base_url: str) -> TokenKey:
+    """Return the (client_id, secret digest, tenant_id, base_url) key for a credential."""
+    client_id, client_secret = split_api_key(api_key)
+    return (client_id, secret_digest(client_id, client_secret), tenant_id, base_url)
 
 
 class APIClient:
     """Async HTTP client for CrowdStrike Falcon API."""
     
-    def __init__(self, api_key: str, tenant_id: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: str,
+        tenant_id: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
         """Initialize API client with credentials.
         
         Args:
             api_key: CrowdStrike API key (client_id)
             tenant_id: Optional tenant ID for multi-tenant scenarios
+            http_client: Optional shared HTTP client; when given, the pool is
+                owned by the caller and is not closed by close()
         """
         self.api_key = api_key
         self.tenant_id = tenant_id
         self.base_url = get_config()["API_BASE_URL"]
-        self.client = httpx.AsyncClient(
+        self._owns_client = http_client is None
+        # Requests awaiting a response, and when the last one finished; the
+        # client registry only closes a shared pool that is idle by both
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.client = http_client or httpx.AsyncClient(
             base_url=self.base_url,
             timeout=30.0,
             headers={
@@ -27,8 +126,8 @@ class APIClient:
             }
         )
     
-    async def _get_auth_token(self) -> str:
-        """Get OAuth2 token from CrowdStrike API.
+    def _get_credentials(self) -> Tuple[str, str]:
+        """Split the API key into client_id and client_secret.
         
         Note: CrowdStrike API keys can be provided in two formats:
         1. "client_id:client_secret" (combined format)
@@ -38,36 +137,55 @@ class APIClient:
         FALCON_CLIENT_SECRET if you want to separate them.
         
         Returns:
-            Bearer token for API authentication
+            Tuple of (client_id, client_secret)
         """
-        auth_url = f"{self.base_url}/oauth2/token"
+        return split_api_key(self.api_key)
+    
+    @property
+    def token_key(self) -> TokenKey:
+        """Key identifying this client's credentials in the token cache.
         
-        # Handle API key format - could be "client_id:client_secret" or just "client_id"
-        if ":" in self.api_key:
-            client_id, client_secret = self.api_key.split(":", 1)
-        else:
-            client_id = self.api_key
-            # Try to get client_secret from environment or use api_key as fallback
-            client_secret = os.getenv("FALCON_CLIENT_SECRET", self.api_key)
+        Also keys cached responses, coalesced requests and batches. The
+        secret is included as a digest, so callers sharing a client_id but
+        not its secret never share tokens or data.
+        """
+        return credential_key(self.api_key, self.tenant_id, self.base_url)
+    
+    async def _mint_auth_token(self) -> Tuple[str, float]:
+        """Request a new OAuth2 token from CrowdStrike API.
         
+        Returns:
+            Tuple of (bearer token, lifetime in seconds)
+        """
+        client_id, client_secret = self._get_credentials()
         data = {
             "client_id": client_id,
             "client_secret": client_secret,
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                auth_url,
-                data=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            response.raise_for_status()
-            token_data = response.json()
-            return token_data.get("access_token", "")
+        response = await self.client.post(
+            "/oauth2/token",
+            data=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        response.raise_for_status()
+        token_data = codec.loads(response.content)
+        return token_data.get("access_token", ""), float(token_data.get("expires_in", 0))
+    
+    async def _get_auth_token(self, force_refresh: bool = False) -> str:
+        """Get OAuth2 token, reusing the process-wide cached token when valid.
+        
+        Args:
+            force_refresh: Mint a new token even if a cached one is valid
+            
+        Returns:
+            Bearer token for API authentication
+        """
+        with tracing.span("token"):
+            return await _token_cache.get_token(self.token_key, self._mint_auth_token, force_refresh)
     
-    async def _get_headers(self) -> Dict[str, str]:
-        """Get headers with authentication token."""
-        token = await self._get_auth_token()
+    def _build_headers(self, token: str) -> Dict[str, str]:
+        """Build request headers for the given bearer token."""
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
@@ -76,35 +194,227 @@ class APIClient:
             headers["X-CS-TENANT-ID"] = self.tenant_id
         return headers
     
-    async def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Make GET request to API."""
-        headers = await self._get_headers()
-        response = await self.client.get(endpoint, headers=headers, params=params)
+    async def _get_headers(self) -> Dict[str, str]:
+        """Get headers with authentication token."""
+        return self._build_headers(await self._get_auth_token())
+    
+    async def _send(self, method: str, endpoint: str, headers: Dict[str, str], **kwargs: Any) -> httpx.Response:
+        """Send one request, recording its latency and the number in flight."""
+        UPSTREAM_IN_FLIGHT.inc()
+        self.in_flight += 1
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with tracing.span("upstream", {"http.method": method, "falcon.endpoint": endpoint}) as current:
+                response = await self.client.request(method, endpoint, headers=headers, **kwargs)
+                status = str(response.status_code)
+                current.set_attribute("http.status_code", response.status_code)
+                tracing.record_trace_id(current, response.headers.get("X-Cs-Traceid"))
+            return response
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+            UPSTREAM_IN_FLIGHT.dec()
+            UPSTREAM_DURATION.observe(time.perf_counter() - started, method=method, endpoint=endpoint, status=status)
+    
+    async def _request(self, method: str, endpoint: str, **kwargs: Any) -> httpx.Response:
+        """Send an authenticated, rate-limited request with retries.
+        
+        Requests are paced by the per-client-id rate limiter. A 429 waits
+        for the advertised retry time and resends, for up to
+        FALCON_RATE_LIMIT_MAX_WAIT seconds; a 401 refreshes the token and
+        resends once. Transient failures are retried according to the
+        request's idempotency class (see retry.classify); rate-limit waits
+        and token refreshes do not count against FALCON_RETRY_MAX_ATTEMPTS.
+        The whole exchange is traced as one ``api`` span.
+        """
+        with tracing.span("api", {"http.method": method, "falcon.endpoint": endpoint}) as current:
+            limiter = get_rate_limiter(self.token_key[0])
+            idempotency = classify(method, endpoint)
+            started = time.monotonic()
+            deadline = started + get_config()["RATE_LIMIT_MAX_WAIT"]
+            token = await self._get_auth_token()
+            refreshed = False
+            # Attempts counted against the retry budget; 401 refreshes and
+            # 429 waits are not
+            failures = 0
+            while True:
+                with tracing.span("ratelimit"):
+                    await limiter.acquire()
+                try:
+                    response = await self._send(method, endpoint, self._build_headers(token), **kwargs)
+                except httpx.TransportError as exc:
+                    failures += 1
+                    delay = _retry_policy.backoff(idempotency, failures, time.monotonic() - started, error=exc)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                limiter.update(response.headers, response.status_code)
+                if response.status_code == 401 and not refreshed:
+                    await _token_cache.invalidate(self.token_key, token)
+                    token = await self._get_auth_token(force_refresh=True)
+                    refreshed = True
+                    continue
+                if response.status_code == 429 and limiter.blocked_until <= deadline:
+                    continue
+                failures += 1
+                delay = _retry_policy.backoff(
+                    idempotency, failures, time.monotonic() - started, status_code=response.status_code
+                )
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+            current.set_attribute("http.status_code", response.status_code)
+            tracing.record_trace_id(current, response.headers.get("X-Cs-Traceid"))
         response.raise_for_status()
-        return response.json()
+        return response
+    
+    def _decode(self, response: httpx.Response) -> Dict[str, Any]:
+        """Decode a JSON response body."""
+        with tracing.span("decode") as current:
+            data = codec.loads(response.content)
+            if isinstance(data, dict):
+                tracing.record_trace_id(current, (data.get("meta") or {}).get("trace_id"))
+            return data
+    
+    async def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Make GET request to API.
+        
+        Responses are served from the response cache when possible, and
+        identical concurrent requests for the same tenant share a single
+        upstream call.
+        """
+        ttl = _response_cache.ttl_for(endpoint)
+        key = _response_cache.make_key(self.token_key, endpoint, params)
+        if ttl > 0:
+            cached = await _response_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        async def fetch() -> Dict[str, Any]:
+            response = await self._request("GET", endpoint, params=params)
+            data = self._decode(response)
+            if ttl > 0:
+                await _response_cache.set(key, data, ttl)
+            return data
+        
+        return dict(await _inflight_gets.do(key, fetch))
+    
+    async def get_raw(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Union[Dict[str, Any], "RawResponse"]:
+        """Make GET request to API without decoding the response.
+        
+        Endpoints served from the response cache need a decoded body, so
+        for those this is the same as get() and returns a dict. Identical
+        concurrent raw requests share a single upstream call.
+        """
+        if _response_cache.ttl_for(endpoint) > 0:
+            return await self.get(endpoint, params)
+        
+        async def fetch() -> RawResponse:
+            return RawResponse.from_response(await self._request("GET", endpoint, params=params))
+        
+        key = _response_cache.make_key(self.token_key, endpoint, params)
+        return await _inflight_gets.do(("raw", key), fetch)
     
     async def post(self, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Make POST request to API."""
-        headers = await self._get_headers()
-        response = await self.client.post(endpoint, headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()
+        response = await self._request("POST", endpoint, content=_encode(data))
+        return self._decode(response)
+    
+    async def post_raw(self, endpoint: str, data: Optional[Dict[str, Any]] = None) -> RawResponse:
+        """Make POST request to API without decoding the response."""
+        return RawResponse.from_response(await self._request("POST", endpoint, content=_encode(data)))
     
     async def put(self, endpoint: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Make PUT request to API."""
-        headers = await self._get_headers()
-        response = await self.client.put(endpoint, headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()
+        response = await self._request("PUT", endpoint, content=_encode(data))
+        return self._decode(response)
     
     async def delete(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Make DELETE request to API."""
-        headers = await self._get_headers()
-        response = await self.client.delete(endpoint, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        response = await self._request("DELETE", endpoint, params=params)
+        return self._decode(response)
+    
+    async def paginate(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        max_results: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate over every page of a query endpoint.
+        
+        Follows ``meta.pagination`` using whichever style the endpoint
+        returns: an ``after`` token, an opaque string ``offset`` token (as
+        used by the scroll endpoints), or a numeric ``offset`` bounded by
+        ``total``. Iteration stops at an empty page, an empty or repeated
+        token, or once ``total`` is reached. Pages are yielded as they
+        arrive so callers never hold more than one page at a time.
+        
+        Args:
+            endpoint: Query endpoint path
+            params: Initial query parameters (``limit`` is the page size)
+            max_results: Optional cap on the total number of resources
+            
+        Yields:
+            Raw API response for each page
+        """
+        params = dict(params or {})
+        fetched = 0
+        while True:
+            if max_results is not None:
+                remaining = max_results - fetched
+                if remaining <= 0:
+                    return
+                if not params.get("limit") or params["limit"] > remaining:
+                    params["limit"] = remaining
+            
+            page = await self.get(endpoint, params=params)
+            resources = page.get("resources") or []
+            if max_results is not None and len(resources) > max_results - fetched:
+                resources = resources[:max_results - fetched]
+                page["resources"] = resources
+            fetched += len(resources)
+            yield page
+            
+            if not resources:
+                return
+            pagination = (page.get("meta") or {}).get("pagination") or {}
+            next_offset = pagination.get("offset")
+            if "after" in pagination:
+                if not pagination["after"]:
+                    return
+                params["after"] = pagination["after"]
+                params.pop("offset", None)
+            elif next_offset == "":
+                return
+            elif isinstance(next_offset, str) and not next_offset.isdigit():
+                total = pagination.get("total")
+                if next_offset == params.get("offset") or (total is not None and fetched >= int(total)):
+                    return
+                params["offset"] = next_offset
+            else:
+                offset = int(params.get("offset") or 0) + len(resources)
+                total = pagination.get("total")
+                if total is not None and offset >= int(total):
+                    return
+                if total is None and params.get("limit") and len(resources) < params["limit"]:
+                    return
+                params["offset"] = offset
+    
+    async def invalidate_cache(self, *prefixes: str) -> int:
+        """Drop this tenant's cached responses for the given endpoint prefixes.
+        
+        Args:
+            prefixes: Endpoint prefixes to invalidate; all entries if omitted
+            
+        Returns:
+            Number of cached responses removed
+        """
+        return await _response_cache.invalidate(self.token_key, *prefixes)
     
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
+        """Close the HTTP client unless it is a shared pool."""
+        if self._owns_client:
+            await self.client.aclose()
 
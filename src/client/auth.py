@@ -0,0 +1,175 @@
+"""OAuth2 bearer token cache for CrowdStrike Falcon API."""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from ..metrics import REGISTRY
+from .shared_store import SharedStore
+from .singleflight import SingleFlight
+
+TOKEN_MINTS = REGISTRY.counter(
+    "falcon_token_mints",
+    "OAuth2 tokens requested from the API, by result (success or error).",
+    ("result",),
+)
+
+# (client_id, secret digest, tenant_id, base_url)
+TokenKey = Tuple[str, str, Optional[str], str]
+
+# Minting coroutine returning (access_token, expires_in seconds)
+TokenMinter = Callable[[], Awaitable[Tuple[str, float]]]
+
+
+class CachedToken:
+    """A bearer token together with its absolute expiry time."""
+
+    def __init__(self, access_token: str, expires_at: float):
+        self.access_token = access_token
+        self.expires_at = expires_at
+
+    def is_fresh(self, refresh_margin: float) -> bool:
+        """Return True if the token is still valid outside the refresh margin."""
+        return time.monotonic() < self.expires_at - refresh_margin
+
+
+class TokenCache:
+    """Process-wide cache of OAuth2 bearer tokens.
+
+    Tokens are keyed by (client_id, secret digest, tenant_id, base_url), so
+    a caller presenting a client_id with the wrong secret never receives the
+    token minted for the right one. Tokens are refreshed
+    ``refresh_margin`` seconds before they expire. Concurrent refreshes for
+    the same key on the same event loop share a single in-flight mint.
+
+    With a shared store, tokens are also published to and looked up in the
+    store, and a lease in the store lets only one process mint a given
+    token while the others wait for it. Store calls block, so they run in a
+    worker thread rather than on the event loop.
+    """
+
+    # Seconds a process may hold the mint lease, and waits for another
+    # process's mint before minting itself
+    MINT_LEASE = 10.0
+
+    def __init__(self, refresh_margin: float = 60.0, store: Optional[SharedStore] = None):
+        """Initialize the token cache.
+
+        Args:
+            refresh_margin: Seconds before expiry at which a token is refreshed
+            store: Optional store shared with other processes
+        """
+        self.refresh_margin = refresh_margin
+        self.store = store
+        self._tokens: Dict[TokenKey, CachedToken] = {}
+        self._inflight = SingleFlight("token")
+        self._lock = threading.Lock()
+
+    async def get_token(self, key: TokenKey, mint: TokenMinter, force_refresh: bool = False) -> str:
+        """Return a valid bearer token for key, minting one if needed.
+
+        Args:
+            key: Cache key (client_id, secret digest, tenant_id, base_url)
+            mint: Coroutine factory that requests a new token
+            force_refresh: Ignore any cached token and mint a new one
+
+        Returns:
+            Bearer token for API authentication
+        """
+        if not force_refresh:
+            with self._lock:
+                cached = self._tokens.get(key)
+            if not (cached and cached.is_fresh(self.refresh_margin)):
+                cached = await self._load_shared(key)
+            if cached and cached.is_fresh(self.refresh_margin):
+                return cached.access_token
+
+        return await self._inflight.do(key, lambda: self._mint(key, mint, force_refresh))
+
+    async def invalidate(self, key: TokenKey, access_token: Optional[str] = None) -> None:
+        """Drop the cached token for key.
+
+        Args:
+            key: Cache key (client_id, secret digest, tenant_id, base_url)
+            access_token: Only drop the entry if it still holds this token, so
+                a token that was already refreshed by another caller is kept
+        """
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached and (access_token is None or cached.access_token == access_token):
+                del self._tokens[key]
+        if self.store is not None:
+            shared = await self._load_shared(key)
+            if shared and (access_token is None or shared.access_token == access_token):
+                await asyncio.to_thread(self.store.delete, "token", _store_key(key))
+
+    def clear(self) -> None:
+        """Drop all cached tokens."""
+        with self._lock:
+            self._tokens.clear()
+
+    async def _mint(self, key: TokenKey, mint: TokenMinter, force_refresh: bool = False) -> str:
+        lease: Optional[str] = None
+        if self.store is not None:
+            lease = await asyncio.to_thread(self.store.acquire_lease, "token", _store_key(key), self.MINT_LEASE)
+            if not force_refresh:
+                # Another process may have published a token just before the
+                # lease was taken, or is minting one now
+                shared = await self._load_shared(key) if lease else await self._wait_for_shared(key)
+                if shared and shared.is_fresh(self.refresh_margin):
+                    if lease:
+                        await asyncio.to_thread(self.store.release_lease, "token", _store_key(key), lease)
+                    return shared.access_token
+        try:
+            try:
+                access_token, expires_in = await mint()
+            except Exception:
+                TOKEN_MINTS.inc(result="error")
+                raise
+            TOKEN_MINTS.inc(result="success")
+            if access_token:
+                with self._lock:
+                    self._tokens[key] = CachedToken(access_token, time.monotonic() + expires_in)
+                if self.store is not None and expires_in > 0:
+                    payload = json.dumps({"access_token": access_token, "expires_at": time.time() + expires_in})
+                    await asyncio.to_thread(self.store.set, "token", _store_key(key), payload.encode(), expires_in)
+            return access_token
+        finally:
+            if lease:
+                await asyncio.to_thread(self.store.release_lease, "token", _store_key(key), lease)
+
+    async def _load_shared(self, key: TokenKey) -> Optional[CachedToken]:
+        """Return the token another process published for key, caching it locally."""
+        if self.store is None:
+            return None
+        value = await asyncio.to_thread(self.store.get, "token", _store_key(key))
+        if value is None:
+            return None
+        payload = json.loads(value)
+        cached = CachedToken(payload["access_token"], time.monotonic() + payload["expires_at"] - time.time())
+        if cached.is_fresh(self.refresh_margin):
+            with self._lock:
+                self._tokens[key] = cached
+        return cached
+
+    async def _wait_for_shared(self, key: TokenKey) -> Optional[CachedToken]:
+        """Wait for the process holding the mint lease to publish a token."""
+        deadline = time.monotonic() + self.MINT_LEASE
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            cached = await self._load_shared(key)
+            if cached and cached.is_fresh(self.refresh_margin):
+                return cached
+        return None
+
+
+def secret_digest(client_id: str, client_secret: str) -> str:
+    """Return a digest identifying a client secret without revealing it."""
+    return hashlib.sha256(f"{client_id}:{client_secret}".encode()).hexdigest()
+
+
+def _store_key(key: TokenKey) -> str:
+    client_id, secret_digest, tenant_id, base_url = key
+    return f"{client_id}|{secret_digest}|{tenant_id or ''}|{base_url}"
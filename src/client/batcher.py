@@ -0,0 +1,180 @@
+"""DataLoader-style micro-batching of entity lookups and writes."""
+import asyncio
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import httpx
+
+from ..metrics import REGISTRY
+
+BATCHED_LOOKUPS = REGISTRY.counter(
+    "falcon_batched_lookups",
+    "Entity lookups merged by the micro-batcher, by outcome (caller, request or fallback).",
+    ("kind",),
+)
+
+EntityFetcher = Callable[[List[str]], Awaitable[Dict[str, Any]]]
+
+# Restricts a batch response to one caller: (response, caller IDs, batch IDs)
+Restrictor = Callable[[Dict[str, Any], List[str], Dict[str, None]], Dict[str, Any]]
+
+
+class _Batch:
+    """IDs collected for one upstream lookup."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.ids: Dict[str, None] = {}
+        self.future: "asyncio.Future[Dict[str, Any]]" = loop.create_future()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Merge ID-based requests issued within a short window into one request.
+
+    Concurrent callers using the same key (e.g. endpoint and tenant, or a
+    write's shared payload) are collected for ``window`` seconds (or until
+    ``max_batch`` IDs are pending), the union is sent once and each caller
+    gets back only the part of the response that concerns its own IDs.
+
+    If the merged request is rejected with a 4xx status, each caller that
+    shared it with other callers' IDs resends its own IDs alone, so one
+    caller's invalid ID does not fail unrelated lookups. Any other failure
+    (transport errors, timeouts, 429 and 5xx responses) is raised to every
+    caller unchanged: resending would multiply load during an outage, and
+    a write's outcome is unknown.
+    """
+
+    def __init__(self, window: float = 0.005, max_batch: int = 100):
+        """Initialize the batcher.
+
+        Args:
+            window: Seconds to wait for more IDs before sending a batch
+            max_batch: Maximum IDs per batch; a full batch is sent immediately
+        """
+        self.window = window
+        self.max_batch = max_batch
+        self._batches: Dict[Tuple[Hashable, int], _Batch] = {}
+        self._lock = threading.RLock()
+
+    async def load(
+        self,
+        key: Hashable,
+        ids: List[str],
+        fetch: EntityFetcher,
+        id_field: str = "id",
+        restrict: Optional[Restrictor] = None,
+    ) -> Dict[str, Any]:
+        """Send ids as part of a shared batch.
+
+        Args:
+            key: Batch identity, e.g. (tenant, endpoint)
+            ids: IDs requested by this caller
+            fetch: Coroutine performing the request for a list of IDs
+            id_field: Field identifying each resource
+            restrict: Optional replacement for the default restriction of
+                ``resources`` and ``errors`` to the caller's IDs
+
+        Returns:
+            API response restricted to this caller's IDs
+        """
+        loop = asyncio.get_running_loop()
+        batch_key = (key, id(loop))
+        with self._lock:
+            batch = self._batches.get(batch_key)
+            if batch is not None and len(batch.ids.keys() | set(ids)) > self.max_batch:
+                self._flush(batch_key, batch, fetch)
+                batch = None
+            if batch is None:
+                batch = _Batch(loop)
+                self._batches[batch_key] = batch
+                batch.timer = loop.call_later(self.window, self._flush, batch_key, batch, fetch)
+            batch.ids.update(dict.fromkeys(ids))
+            if len(batch.ids) >= self.max_batch:
+                self._flush(batch_key, batch, fetch)
+        BATCHED_LOOKUPS.inc(kind="caller")
+        try:
+            response = await asyncio.shield(batch.future)
+        except Exception as exc:
+            if batch.ids.keys() <= set(ids) or not is_rejection(exc):
+                raise
+            BATCHED_LOOKUPS.inc(kind="fallback")
+            return await fetch(ids)
+        if restrict is not None:
+            return restrict(response, ids, batch.ids)
+        return _restrict(response, ids, id_field, batch.ids)
+
+    def _flush(self, batch_key: Tuple[Hashable, int], batch: _Batch, fetch: EntityFetcher) -> None:
+        """Send a batch. Safe to call more than once for the same batch."""
+        with self._lock:
+            if self._batches.get(batch_key) is batch:
+                del self._batches[batch_key]
+            elif batch.timer is None:
+                return
+            if batch.timer is not None:
+                batch.timer.cancel()
+                batch.timer = None
+        BATCHED_LOOKUPS.inc(kind="request")
+        task = asyncio.ensure_future(fetch(list(batch.ids)))
+        task.add_done_callback(lambda done: _settle(batch.future, done))
+
+
+def is_rejection(error: Exception) -> bool:
+    """Return True if error is a definite client-error response.
+
+    408 and 429 say nothing about the request's content, so they do not
+    count as rejections.
+    """
+    if not isinstance(error, httpx.HTTPStatusError):
+        return False
+    status_code = error.response.status_code
+    return 400 <= status_code < 500 and status_code not in (408, 429)
+
+
+def _settle(future: "asyncio.Future[Dict[str, Any]]", task: "asyncio.Future[Dict[str, Any]]") -> None:
+    if future.done():
+        return
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+def _restrict(response: Dict[str, Any], ids: List[str], id_field: str, batch_ids: Dict[str, None]) -> Dict[str, Any]:
+    """Keep only the resources and errors that belong to ids, in their order."""
+    wanted = dict.fromkeys(ids)
+    by_id = {resource.get(id_field): resource for resource in response.get("resources") or []}
+    resources = [by_id[resource_id] for resource_id in wanted if resource_id in by_id]
+    errors = restrict_errors(response.get("errors") or [], ids, batch_ids)
+    return {"meta": dict(response.get("meta") or {}), "resources": resources, "errors": errors}
+
+
+def restrict_errors(errors: List[Dict[str, Any]], ids: List[str], batch_ids: Dict[str, None]) -> List[Dict[str, Any]]:
+    """Keep errors that mention one of ids or none of the batch's IDs."""
+    wanted = set(ids)
+    kept = []
+    for error in errors:
+        text = f"{error.get('id', '')} {error.get('message', '')}"
+        mentioned = [batch_id for batch_id in batch_ids if mentions_id(text, batch_id)]
+        if not mentioned or any(batch_id in wanted for batch_id in mentioned):
+            kept.append(error)
+    return kept
+
+
+def mentions_id(text: str, item_id: str) -> bool:
+    """Return True if text mentions item_id as a whole ID.
+
+    An ID that is a prefix or suffix of a longer ID in the text (e.g.
+    ``ldt:abc:12`` in ``ldt:abc:123``) does not count as mentioned.
+    """
+    return bool(item_id) and item_id in text and _id_pattern(item_id).search(text) is not None
+
+
+@lru_cache(maxsize=4096)
+def _id_pattern(item_id: str) -> "re.Pattern[str]":
+    # IDs, domains and addresses are made of word characters, ':', '-' and
+    # '.'; a trailing '.' that ends a sentence is not part of the ID
+    return re.compile(rf"(?<![\w:.-]){re.escape(item_id)}(?![\w:-]|\.\w)")
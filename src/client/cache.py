@@ -0,0 +1,150 @@
+"""In-memory response cache for CrowdStrike Falcon read endpoints."""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .. import codec
+from ..metrics import REGISTRY
+from .shared_store import SharedStore
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "falcon_cache_requests",
+    "Response cache lookups, by result (hit or miss).",
+    ("result",),
+)
+
+# Default TTLs in seconds, by endpoint prefix. Only these rarely changing
+# resources are cached unless FALCON_CACHE_TTLS says otherwise.
+DEFAULT_TTLS: Dict[str, float] = {
+    "/devices/queries/host-groups/": 300.0,
+    "/devices/entities/host-groups/": 300.0,
+    "/policy/queries/prevention/": 300.0,
+    "/policy/entities/prevention/": 300.0,
+    "/policy/queries/sensor-update/": 300.0,
+    "/policy/entities/sensor-update/": 300.0,
+}
+
+CacheKey = Tuple[Hashable, str, Tuple[Tuple[str, str], ...]]
+
+
+def parse_ttls(value: str) -> Dict[str, float]:
+    """Parse a ``prefix=seconds,prefix=seconds`` TTL specification."""
+    ttls: Dict[str, float] = {}
+    for item in value.split(","):
+        if "=" in item:
+            prefix, seconds = item.rsplit("=", 1)
+            ttls[prefix.strip()] = float(seconds)
+    return ttls
+
+
+class ResponseCache:
+    """Bounded LRU cache with per-endpoint TTLs.
+
+    Entries are keyed per tenant on the endpoint and its canonicalised query
+    parameters. The TTL for an endpoint is taken from the longest matching
+    prefix in ``ttls``; endpoints without a positive TTL are not cached.
+    Responses are held encoded and decoded on every hit, so no caller ever
+    receives, or can modify, the cached object.
+
+    With a shared store, entries live in the store instead of in memory, so
+    every process sees the same entries and invalidations. Store calls
+    block, so they run in a worker thread rather than on the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        store: Optional[SharedStore] = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached responses held in memory
+            ttls: TTL in seconds by endpoint prefix
+            store: Optional store shared with other processes
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.store = store
+        self._entries: "OrderedDict[CacheKey, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, endpoint: str) -> float:
+        """Return the TTL for an endpoint, or 0 if it is not cached."""
+        matches = [prefix for prefix in self.ttls if endpoint.startswith(prefix)]
+        return self.ttls[max(matches, key=len)] if matches else 0.0
+
+    @staticmethod
+    def make_key(tenant: Hashable, endpoint: str, params: Optional[Dict[str, Any]] = None) -> CacheKey:
+        """Build a cache key with parameters in canonical order."""
+        items = []
+        for name, value in (params or {}).items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ",".join(str(v) for v in value)
+            items.append((name, str(value)))
+        return (tenant, endpoint, tuple(sorted(items)))
+
+    async def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached response, or None on a miss."""
+        if self.store is not None:
+            value = await asyncio.to_thread(self.store.get, "response", _store_key(key))
+            CACHE_REQUESTS.inc(result="miss" if value is None else "hit")
+            return codec.loads(value) if value is not None else None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc(result="miss" if entry is None else "hit")
+        return codec.loads(entry[1]) if entry is not None else None
+
+    async def set(self, key: CacheKey, value: Dict[str, Any], ttl: float) -> None:
+        """Store a response for ttl seconds, evicting the least recently used entry."""
+        encoded = codec.dumps(value)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, "response", _store_key(key), encoded, ttl)
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, encoded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def invalidate(self, tenant: Hashable, *prefixes: str) -> int:
+        """Drop a tenant's entries whose endpoint starts with any of prefixes.
+
+        Returns:
+            Number of in-memory entries removed
+        """
+        if self.store is not None:
+            for prefix in prefixes or ("",):
+                await asyncio.to_thread(self.store.delete_prefix, "response", _store_prefix(tenant) + prefix)
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[0] == tenant and (not prefixes or key[1].startswith(prefixes))
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+
+def _store_prefix(tenant: Hashable) -> str:
+    """Return the shared-store key prefix for a tenant's entries."""
+    if isinstance(tenant, tuple):
+        tenant = "|".join("" if part is None else str(part) for part in tenant)
+    return f"{tenant}\x1f"
+
+
+def _store_key(key: CacheKey) -> str:
+    """Return the shared-store key for a cache key."""
+    tenant, endpoint, params = key
+    return _store_prefix(tenant) + endpoint + "\x1f" + "&".join(f"{name}={value}" for name, value in params)
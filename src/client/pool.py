@@ -0,0 +1,214 @@
+"""Shared, pooled HTTP clients for CrowdStrike Falcon API."""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from config import get_config
+from .api_client import APIClient, credential_key
+from .auth import TokenKey
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# (base_url, event loop id)
+PoolKey = Tuple[str, int]
+# (credential key, event loop id); the credential key holds a digest of the
+# secret rather than the secret itself
+ClientKey = Tuple[TokenKey, int]
+
+
+class _PoolEntry:
+    """A pooled httpx client bound to the event loop that created it."""
+
+    def __init__(self, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
+        self.client = client
+        self.loop = loop
+        self.last_used = time.monotonic()
+
+
+class ClientRegistry:
+    """Registry handing out shared APIClient instances.
+
+    One pooled ``httpx.AsyncClient`` is kept per base URL and event loop and
+    shared by every credential, so keep-alive connections are reused across
+    tool calls. Pools that have been idle for ``idle_timeout`` seconds are
+    closed on the next lookup. A pool counts as idle only when none of its
+    clients has a request in flight or finished one within the timeout, so
+    a long export holding a client keeps its pool open.
+
+    At most ``max_clients`` APIClients are kept. Clients idle for
+    ``idle_timeout`` seconds are dropped on the sweep, and beyond the limit
+    the least recently used ones without requests in flight are dropped.
+    Dropped clients hold nothing to close, since their connections belong
+    to the shared pool.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        idle_timeout: float = 300.0,
+        timeout: float = 30.0,
+        max_clients: int = 1024,
+    ):
+        """Initialize the registry.
+
+        Args:
+            max_connections: Maximum concurrent connections per pool
+            max_keepalive_connections: Maximum idle keep-alive connections per pool
+            keepalive_expiry: Seconds an idle keep-alive connection is kept open
+            http2: Negotiate HTTP/2 when the h2 package is installed
+            idle_timeout: Seconds after which an unused pool is closed
+            timeout: Request timeout in seconds
+            max_clients: Maximum number of credentials with a cached APIClient
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_clients = max_clients
+        self._pools: Dict[PoolKey, _PoolEntry] = {}
+        self._clients: "OrderedDict[ClientKey, APIClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def get(self, api_key: str, tenant_id: Optional[str] = None) -> APIClient:
+        """Return the shared APIClient for a credential on the running loop.
+
+        Args:
+            api_key: CrowdStrike API key (client_id)
+            tenant_id: Optional tenant ID for multi-tenant scenarios
+
+        Returns:
+            APIClient backed by a pooled HTTP connection
+        """
+        loop = asyncio.get_running_loop()
+        base_url = get_config()["API_BASE_URL"]
+        pool_key = (base_url, id(loop))
+        client_key = (credential_key(api_key, tenant_id, base_url), id(loop))
+        with self._lock:
+            self._sweep_idle()
+            pool = self._pools.get(pool_key)
+            if pool is None:
+                pool = _PoolEntry(self._create_http_client(base_url), loop)
+                self._pools[pool_key] = pool
+            pool.last_used = time.monotonic()
+            client = self._clients.get(client_key)
+            if client is None or client.client is not pool.client:
+                client = APIClient(api_key, tenant_id, http_client=pool.client)
+                self._clients[client_key] = client
+            self._clients.move_to_end(client_key)
+            self._evict_clients()
+            return client
+
+    async def aclose(self) -> None:
+        """Close every pool bound to the running event loop."""
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            closing = [key for key in self._pools if key[1] == loop_id]
+            entries = [self._pools.pop(key) for key in closing]
+            for key in [key for key in self._clients if key[1] == loop_id]:
+                del self._clients[key]
+        for entry in entries:
+            await entry.client.aclose()
+
+    def _create_http_client(self, base_url: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            }
+        )
+
+    def _sweep_idle(self) -> None:
+        """Close pools idle for longer than idle_timeout. Caller holds the lock."""
+        now = time.monotonic()
+        if now - self._last_sweep < self.idle_timeout / 2:
+            return
+        self._last_sweep = now
+        expired = [key for key, entry in self._pools.items() if self._is_idle(entry, now)]
+        for key in expired:
+            entry = self._pools.pop(key)
+            for client_key in [k for k, v in self._clients.items() if v.client is entry.client]:
+                del self._clients[client_key]
+            if not entry.loop.is_closed():
+                asyncio.run_coroutine_threadsafe(entry.client.aclose(), entry.loop)
+        for client_key in [
+            k for k, v in self._clients.items() if not v.in_flight and now - v.last_used > self.idle_timeout
+        ]:
+            del self._clients[client_key]
+
+    def _evict_clients(self) -> None:
+        """Drop least recently used clients beyond max_clients. Caller holds the lock."""
+        excess = len(self._clients) - self.max_clients
+        if excess <= 0:
+            return
+        # The most recently used client was just handed out and is kept
+        candidates = list(self._clients.items())[:-1]
+        for client_key in [k for k, v in candidates if not v.in_flight][:excess]:
+            del self._clients[client_key]
+
+    def _is_idle(self, entry: _PoolEntry, now: float) -> bool:
+        """Return True if no client of the pool was used within idle_timeout. Caller holds the lock."""
+        if now - entry.last_used <= self.idle_timeout:
+            return False
+        for client in self._clients.values():
+            if client.client is entry.client and (
+                client.in_flight or now - client.last_used <= self.idle_timeout
+            ):
+                return False
+        return True
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> ClientRegistry:
+    """Return the process-wide client registry, creating it from config."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            config = get_config()
+            _registry = ClientRegistry(
+                max_connections=config["HTTP_MAX_CONNECTIONS"],
+                max_keepalive_connections=config["HTTP_MAX_KEEPALIVE_CONNECTIONS"],
+                keepalive_expiry=config["HTTP_KEEPALIVE_EXPIRY"],
+                http2=config["HTTP2_ENABLED"],
+                idle_timeout=config["HTTP_POOL_IDLE_TIMEOUT"],
+                max_clients=config["HTTP_MAX_CLIENTS"],
+            )
+        return _registry
+
+
+def get_api_client(api_key: str, tenant_id: Optional[str] = None) -> APIClient:
+    """Return a shared, pooled APIClient for the given credentials."""
+    return get_client_registry().get(api_key, tenant_id)
+
+
+async def close_api_clients() -> None:
+    """Close all pooled clients bound to the running event loop."""
+    if _registry is not None:
+        await _registry.aclose()
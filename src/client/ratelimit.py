@@ -0,0 +1,127 @@
+"""Rate-limit-aware request scheduling for CrowdStrike Falcon API."""
+import asyncio
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from config import get_config
+from ..metrics import REGISTRY
+
+RATE_LIMIT_REMAINING = REGISTRY.gauge(
+    "falcon_rate_limit_remaining",
+    "Requests left in the current window as reported by X-RateLimit-Remaining, by client.",
+    ("client",),
+)
+RATE_LIMIT_LIMIT = REGISTRY.gauge(
+    "falcon_rate_limit_limit",
+    "Requests allowed per window as reported by X-RateLimit-Limit, by client.",
+    ("client",),
+)
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "falcon_rate_limit_wait_seconds",
+    "Time requests waited for the rate limiter, by client.",
+    ("client",),
+)
+
+
+class RateLimiter:
+    """Token bucket pacing requests for one API client ID.
+
+    The bucket holds up to ``limit`` tokens and refills at ``limit`` tokens
+    per ``period`` seconds. Its state is corrected from Falcon's
+    ``X-RateLimit-Limit``/``X-RateLimit-Remaining`` headers, and a 429 with
+    ``X-RateLimit-RetryAfter`` blocks the bucket until that time. Callers
+    reserve a token and sleep until it is theirs, so an exhausted budget
+    queues requests in arrival order instead of failing them.
+    """
+
+    def __init__(self, limit: int = 6000, period: float = 60.0, label: str = ""):
+        """Initialize the limiter.
+
+        Args:
+            limit: Requests allowed per period until the API reports otherwise
+            period: Length of the rate limit window in seconds
+            label: Client label for the rate limit metrics
+        """
+        self.label = label
+        self.limit = limit
+        self.period = period
+        self.tokens = float(limit)
+        self.remaining: Optional[int] = None
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second."""
+        return self.limit / self.period
+
+    async def acquire(self) -> float:
+        """Wait until a request may be sent.
+
+        Returns:
+            Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(self.blocked_until - now, -self.tokens / self.rate if self.tokens < 0 else 0.0)
+        RATE_LIMIT_WAIT.observe(max(wait, 0.0), client=self.label)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def update(self, headers: Mapping[str, str], status_code: int = 200) -> None:
+        """Update the budget from a response's rate limit headers."""
+        limit = _int_header(headers, "X-RateLimit-Limit")
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit:
+                self.limit = limit
+            if remaining is not None:
+                self.remaining = remaining
+                self.tokens = min(self.tokens, float(remaining))
+            if status_code == 429:
+                retry_after = _int_header(headers, "X-RateLimit-RetryAfter")
+                delay = max(retry_after - time.time(), 0.0) if retry_after else 1.0
+                self.blocked_until = max(self.blocked_until, now + delay)
+                self.tokens = min(self.tokens, 0.0)
+            RATE_LIMIT_LIMIT.set(self.limit, client=self.label)
+            if self.remaining is not None:
+                RATE_LIMIT_REMAINING.set(self.remaining, client=self.label)
+
+    def _refill(self, now: float) -> None:
+        """Add tokens for the time elapsed since the last update. Caller holds the lock."""
+        self.tokens = min(float(self.limit), self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _client_label(client_id: str) -> str:
+    """Shorten a client ID for use as a metric label, so /metrics does not list full IDs."""
+    return client_id[:8]
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(client_id: str) -> RateLimiter:
+    """Return the process-wide rate limiter for an API client ID."""
+    with _limiters_lock:
+        limiter = _limiters.get(client_id)
+        if limiter is None:
+            limiter = RateLimiter(limit=get_config()["RATE_LIMIT_PER_MINUTE"], label=_client_label(client_id))
+            _limiters[client_id] = limiter
+        return limiter
@@ -0,0 +1,109 @@
+"""Retry policy for CrowdStrike Falcon API requests."""
+import random
+from typing import Optional
+
+import httpx
+
+from ..metrics import REGISTRY
+
+# Idempotency classes
+SAFE = "safe"                      # reads, including Falcon's POST-as-GET endpoints
+IDEMPOTENT = "idempotent"          # writes that can be repeated harmlessly (PUT, DELETE)
+NON_IDEMPOTENT = "non_idempotent"  # writes that must not be sent twice (POST)
+
+RETRYABLE_STATUS = {
+    SAFE: frozenset({408, 500, 502, 503, 504}),
+    IDEMPOTENT: frozenset({502, 503, 504}),
+    NON_IDEMPOTENT: frozenset(),
+}
+
+# Transport errors raised before the request reached the server
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+RETRIES = REGISTRY.counter(
+    "falcon_upstream_retries",
+    "Upstream requests retried, by idempotency class and reason.",
+    ("idempotency", "reason"),
+)
+RETRY_DELAY = REGISTRY.histogram(
+    "falcon_upstream_retry_delay_seconds",
+    "Backoff delay before each upstream retry.",
+    ("idempotency",),
+)
+
+
+def classify(method: str, endpoint: str) -> str:
+    """Return the idempotency class of a request.
+
+    Falcon exposes several read endpoints as POST with ``/GET/`` in the path
+    (e.g. ``/detects/entities/summaries/GET/v1``); those are treated as reads.
+    """
+    method = method.upper()
+    if method in ("GET", "HEAD", "OPTIONS") or (method == "POST" and "/GET/" in endpoint):
+        return SAFE
+    if method in ("PUT", "DELETE"):
+        return IDEMPOTENT
+    return NON_IDEMPOTENT
+
+
+class RetryPolicy:
+    """Jittered exponential backoff bounded by attempts and a total deadline."""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 5.0,
+        deadline: float = 30.0,
+    ):
+        """Initialize the policy.
+
+        Args:
+            max_attempts: Maximum number of attempts including the first
+            base_delay: Backoff for the first retry in seconds
+            max_delay: Upper bound for a single backoff in seconds
+            deadline: Seconds after the first attempt past which no retry starts
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(
+        self,
+        idempotency: str,
+        attempt: int,
+        elapsed: float,
+        status_code: Optional[int] = None,
+        error: Optional[Exception] = None,
+    ) -> Optional[float]:
+        """Return the delay before retrying, or None if the request must not be retried.
+
+        Args:
+            idempotency: Idempotency class from classify()
+            attempt: Number of attempts so far that ended in a transient
+                failure; rate-limit waits and token refreshes are not counted
+            elapsed: Seconds since the first attempt
+            status_code: Response status, when a response was received
+            error: Transport error, when no response was received
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if error is not None:
+            if isinstance(error, CONNECT_ERRORS):
+                reason = "connect"
+            elif idempotency != NON_IDEMPOTENT and isinstance(error, httpx.TransportError):
+                reason = "transport"
+            else:
+                return None
+        elif status_code in RETRYABLE_STATUS[idempotency]:
+            reason = str(status_code)
+        else:
+            return None
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if elapsed + delay > self.deadline:
+            return None
+        RETRIES.inc(idempotency=idempotency, reason=reason)
+        RETRY_DELAY.observe(delay, idempotency=idempotency)
+        return delay
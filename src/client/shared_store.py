@@ -0,0 +1,242 @@
+"""Cross-process key/value store for tokens and cached responses.
+
+Gateway workers run as separate processes, so the in-memory token and
+response caches are per worker. A shared store lets every worker reuse the
+tokens and responses fetched by the others. Two backends are available:
+
+* SQLite (``sqlite:///path/to/file.db`` or a plain path), for workers on one
+  host. The database runs in WAL mode so readers never block each other.
+* Redis (``redis://host:port/db``), served by Redis or any server speaking
+  its protocol. Requires the ``redis`` package.
+
+Store calls block; callers on an event loop run them in a worker thread.
+"""
+import abc
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class SharedStore(abc.ABC):
+    """Interface of a shared store. Values are bytes with a TTL in seconds."""
+
+    @abc.abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """Return the value for key, or None if it is missing or expired."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        """Store value for ttl seconds."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove key."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_prefix(self, namespace: str, prefix: str) -> None:
+        """Remove every key starting with prefix."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def acquire_lease(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        """Try to take an exclusive lease on key for ttl seconds.
+
+        Returns:
+            A token identifying this holder, needed to release the lease,
+            or None if someone else holds it
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def release_lease(self, namespace: str, key: str, token: str) -> None:
+        """Release a lease taken with acquire_lease, if token still holds it.
+
+        A holder whose lease expired and was taken by someone else must
+        not release the new holder's lease.
+        """
+        raise NotImplementedError
+
+
+class SQLiteStore(SharedStore):
+    """Shared store in a local SQLite database."""
+
+    # Expired rows are purged once every this many writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str):
+        """Initialize the store, creating the database if needed.
+
+        Args:
+            path: Database file; created readable by the current user only
+        """
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        if not os.path.exists(path):
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS shared_store ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are per thread)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM shared_store WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO shared_store (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, time.time() + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            connection.execute("DELETE FROM shared_store WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connection().execute("DELETE FROM shared_store WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def delete_prefix(self, namespace: str, prefix: str) -> None:
+        self._connection().execute(
+            "DELETE FROM shared_store WHERE namespace = ? AND key >= ? AND key < ?",
+            (namespace, prefix, prefix + "\U0010ffff"),
+        )
+
+    def acquire_lease(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        now = time.time()
+        token = secrets.token_hex(16)
+        cursor = self._connection().execute(
+            "INSERT INTO shared_store (namespace, key, value, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE shared_store.expires_at <= ?",
+            (f"lease:{namespace}", key, token.encode(), now + ttl, now),
+        )
+        return token if cursor.rowcount == 1 else None
+
+    def release_lease(self, namespace: str, key: str, token: str) -> None:
+        self._connection().execute(
+            "DELETE FROM shared_store WHERE namespace = ? AND key = ? AND value = ?",
+            (f"lease:{namespace}", key, token.encode()),
+        )
+
+
+class RedisStore(SharedStore):
+    """Shared store on a Redis-protocol server."""
+
+    # Deletes KEYS[1] only if it still holds the caller's token ARGV[1]
+    RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, url: str, prefix: str = "falcon-mcp"):
+        """Initialize the store.
+
+        Args:
+            url: Server URL, e.g. redis://localhost:6379/0
+            prefix: Prefix for every key written
+        """
+        if redis is None:
+            raise RuntimeError("FALCON_SHARED_STORE uses redis:// but the 'redis' package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return self.client.get(self._key(namespace, key))
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(self._key(namespace, key), value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, namespace: str, key: str) -> None:
+        self.client.delete(self._key(namespace, key))
+
+    def delete_prefix(self, namespace: str, prefix: str) -> None:
+        pattern = self._key(namespace, _escape_glob(prefix)) + "*"
+        keys = list(self.client.scan_iter(match=pattern, count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def acquire_lease(self, namespace: str, key: str, ttl: float) -> Optional[str]:
+        token = secrets.token_hex(16)
+        leased = self.client.set(self._key(f"lease:{namespace}", key), token, nx=True, px=max(1, int(ttl * 1000)))
+        return token if leased else None
+
+    def release_lease(self, namespace: str, key: str, token: str) -> None:
+        self._release(keys=[self._key(f"lease:{namespace}", key)], args=[token])
+
+
+def _escape_glob(value: str) -> str:
+    """Escape Redis glob metacharacters."""
+    for char in "\\*?[]":
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+def open_shared_store(spec: str) -> Optional[SharedStore]:
+    """Open the store described by a FALCON_SHARED_STORE value.
+
+    Args:
+        spec: ``redis://...``, ``rediss://...``, ``sqlite:///path`` or a file path;
+            empty for no shared store
+
+    Returns:
+        The store, or None if spec is empty
+    """
+    if not spec:
+        return None
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(spec)
+    if spec.startswith("sqlite:///"):
+        spec = spec[len("sqlite:///"):]
+    return SQLiteStore(spec)
+
+
+_shared_store: Optional[SharedStore] = None
+_shared_store_loaded = False
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_store() -> Optional[SharedStore]:
+    """Return the process-wide shared store configured by FALCON_SHARED_STORE."""
+    global _shared_store, _shared_store_loaded
+    with _shared_store_lock:
+        if not _shared_store_loaded:
+            _shared_store = open_shared_store(get_config()["SHARED_STORE"])
+            _shared_store_loaded = True
+            if _shared_store is not None:
+                logger.info("Sharing tokens and cached responses through %s", type(_shared_store).__name__)
+        return _shared_store
@@ -0,0 +1,63 @@
+"""Coalescing of identical concurrent upstream calls."""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from ..metrics import REGISTRY
+
+COALESCED = REGISTRY.counter(
+    "falcon_singleflight_coalesced",
+    "Calls that joined an identical call already in flight.",
+    ("kind",),
+)
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its result.
+
+    Callers that arrive while a call with the same key is in flight await
+    that call instead of starting their own. The shared call runs as a task
+    shielded from caller cancellation. Calls are tracked per event loop.
+    """
+
+    def __init__(self, kind: str = ""):
+        """Initialize the group.
+
+        Args:
+            kind: Label used for the coalesced-calls metric
+        """
+        self.kind = kind
+        self._calls: Dict[Tuple[Hashable, int], "asyncio.Task[Any]"] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of fn(), sharing it with concurrent callers of key.
+
+        Args:
+            key: Identity of the call
+            fn: Coroutine factory performing the call
+
+        Returns:
+            Result of the (possibly shared) call
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (key, id(loop))
+        with self._lock:
+            task = self._calls.get(call_key)
+            if task is None:
+                task = loop.create_task(fn())
+                self._calls[call_key] = task
+                task.add_done_callback(lambda _: self._forget(call_key, task))
+            else:
+                COALESCED.inc(kind=self.kind)
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """Return the number of calls currently in flight."""
+        with self._lock:
+            return len(self._calls)
+
+    def _forget(self, call_key: Tuple[Hashable, int], task: "asyncio.Task[Any]") -> None:
+        with self._lock:
+            if self._calls.get(call_key) is task:
+                del self._calls[call_key]
@@ -0,0 +1,52 @@
+"""JSON codec used for upstream responses and gateway output.
+
+orjson is used when it is installed, which is several times faster than the
+stdlib ``json`` module on large host and detection pages. Set
+FALCON_JSON_CODEC to ``json`` to force the stdlib implementation.
+"""
+import json
+import logging
+from typing import Any, Union
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _select_backend() -> str:
+    requested = get_config()["JSON_CODEC"]
+    if requested == "orjson" and orjson is None:
+        logger.warning("FALCON_JSON_CODEC=orjson but orjson is not installed; using json")
+    if requested in ("auto", "orjson") and orjson is not None:
+        return "orjson"
+    return "json"
+
+
+# Name of the active implementation ("orjson" or "json")
+BACKEND = _select_backend()
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode a JSON document."""
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON.
+
+    Values orjson cannot encode (e.g. integers beyond 64 bits) fall back to
+    the stdlib encoder.
+    """
+    if BACKEND == "orjson":
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -1,9 +1,177 @@
 """HTTP Gateway layer for CrowdStrike Falcon MCP Server."""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, Optional
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
 from config import get_config
-from src.mcp_server import mcp
+from src import codec, tracing
+from src.client import RawResponse, close_api_clients
+from src.mcp_server import mcp, TOOL_IMPLEMENTATIONS
+from src.metrics import CONTENT_TYPE, REGISTRY
+from src.tool_registry import ToolEntry, build_tool_registry
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Pages buffered between a streaming tool and a slow client; the tool waits
+# when the buffer is full, so memory stays flat however large the export.
+STREAM_BUFFER_PAGES = 2
+
+
+def _wants_stream(request: Request, body: Dict[str, Any]) -> bool:
+    """Return True if the caller asked for an NDJSON stream."""
+    stream = body.pop("stream", False)
+    if isinstance(stream, str):
+        stream = stream.lower() in ("1", "true", "yes")
+    return bool(stream) or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured JSON codec."""
+    
+    def render(self, content: Any) -> bytes:
+        with tracing.span("encode"):
+            return codec.dumps(content)
+
+
+def _ndjson_line(item: Dict[str, Any]) -> bytes:
+    with tracing.span("encode"):
+        return codec.dumps(item) + b"\n"
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header to every response.
+    
+    The header lists the time spent in each traced phase of the request
+    (tool, api, token, ratelimit, upstream, decode, encode), the total, and
+    the Falcon trace IDs of the upstream responses. For NDJSON streams it
+    covers the work done before the first page was sent.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        
+        with tracing.collect_timings() as timings:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    value = timings.server_timing(total=time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", value.encode())]}
+                await send(message)
+            
+            await self.app(scope, receive, send_with_timing)
+
+
+async def _stream_tool(tool: ToolEntry, tool_params: Dict[str, Any]) -> StreamingResponse:
+    """Run a tool and stream each response page as one NDJSON line.
+    
+    Tools that accept a page_callback emit pages as they arrive from
+    upstream; any other tool's result is sent as a single line. Errors
+    raised before the first page propagate normally so they still map to
+    an HTTP status; later errors are sent as a final line with an errors
+    list, since the status has already gone out.
+    """
+    if not tool.accepts_page_callback:
+        result = await tool.call(**tool_params)
+        return StreamingResponse(iter([_ndjson_line(result)]), media_type=NDJSON_MEDIA_TYPE)
+    
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=STREAM_BUFFER_PAGES)
+    
+    async def run() -> None:
+        try:
+            await tool.call(**tool_params, page_callback=queue.put)
+        finally:
+            await queue.put(None)
+    
+    task = asyncio.ensure_future(run())
+    first = await queue.get()
+    if first is None:
+        await task
+        return StreamingResponse(iter(()), media_type=NDJSON_MEDIA_TYPE)
+    
+    async def lines() -> AsyncIterator[bytes]:
+        try:
+            page = first
+            while page is not None:
+                yield _ndjson_line(page)
+                page = await queue.get()
+            await task
+        except Exception as e:
+            yield _ndjson_line({"errors": [{"code": 500, "message": f"Tool execution error: {str(e)}"}]})
+        finally:
+            task.cancel()
+    
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def _resolve_call(request: Request, tool_name: str, body: Dict[str, Any]) -> Tuple[ToolEntry, Dict[str, Any]]:
+    """Look up a tool and validate its arguments.
+    
+    api_key and tenant_id are taken from the body, falling back to the
+    X-API-Key and X-Tenant-ID headers.
+    
+    Raises:
+        HTTPException: 400 without an API key, 404 for an unknown tool and
+            422 for invalid arguments
+    """
+    api_key = body.get("api_key") or request.headers.get("X-API-Key")
+    tenant_id = body.get("tenant_id") or request.headers.get("X-Tenant-ID")
+    
+    if not api_key:
+        raise HTTPException(
+            status_code=400,
+            detail="api_key is required (provide in request body or X-API-Key header)"
+        )
+    
+    tools: Dict[str, ToolEntry] = request.app.state.tools
+    tool = tools.get(tool_name)
+    if tool is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Tool '{tool_name}' not found. Available tools: {list(tools)}"
+        )
+    
+    tool_params = {k: v for k, v in body.items() if k not in ["api_key", "tenant_id"]}
+    if tenant_id:
+        tool_params["tenant_id"] = tenant_id
+    tool_params["api_key"] = api_key
+    try:
+        return tool, tool.validate(tool_params)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=e.errors(include_url=False, include_context=False, include_input=False),
+        )
+
+
+def _http_error(error: Exception) -> HTTPException:
+    """Map an exception raised by a tool to an HTTP error."""
+    if isinstance(error, ValueError):
+        return HTTPException(status_code=400, detail=str(error))
+    return HTTPException(status_code=500, detail=f"Tool execution error: {str(error)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the tool registry on startup and close pooled upstream connections on shutdown."""
+    app.state.tools = await build_tool_registry(app.state.mcp_server, TOOL_IMPLEMENTATIONS)
+    try:
+        yield
+    finally:
+        await close_api_clients()
 
 
 def create_http_app(mcp_server) -> FastAPI:
@@ -19,13 +187,22 @@ def create_http_app(mcp_server) -> FastAPI:
         title="CrowdStrike Falcon MCP Server",
         description="HTTP/REST gateway for CrowdStrike Falcon MCP Server",
         version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=CodecJSONResponse,
     )
+    app.state.mcp_server = mcp_server
+    app.add_middleware(ServerTimingMiddleware)
     
     @app.get("/healthz")
     async def health_check():
         """Health check endpoint for orchestrators."""
         return {"status": "ok", "service": "crowdstrike-falcon-mcp"}
     
+    @app.get("/metrics")
+    async def metrics():
+        """Prometheus metrics for tool calls, upstream requests, tokens, caching and rate limits."""
+        return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+    
     @app.get("/")
     async def root():
         """Root endpoint with service information."""
@@ -35,54 +212,26 @@ def create_http_app(mcp_server) -> FastAPI:
             "transport": "HTTP/REST",
             "endpoints": {
                 "health": "/healthz",
+                "metrics": "/metrics",
                 "tools": "/tools",
                 "call_tool": "/tools/{tool_name}",
+                "call_tools_batch": "/tools:batch",
             },
             "documentation": "/docs",
         }
     
     @app.get("/tools")
-    async def list_tools():
-        """List all available MCP tools."""
-        try:
-            # Get tools from MCP server
-            # Note: This is a simplified approach - you may need to adjust based on FastMCP API
-            tools = []
-            # In a real implementation, you'd query the MCP server for available tools
-            # For now, we'll return a static list based on what we know
-            known_tools = [
-                "query_hosts",
-                "get_host_details",
-                "query_detections",
-                "get_detection_details",
-                "update_detection_status",
-                "query_iocs",
-                "create_ioc",
-                "delete_ioc",
-                "query_host_groups",
-                "get_host_group_details",
-                "query_prevention_policies",
-                "get_prevention_policy_details",
-                "query_sensor_update_policies",
-                "get_sensor_update_policy_details",
-            ]
-            return {
-                "tools": [
-                    {
-                        "name": tool_name,
-                        "description": f"Execute {tool_name} tool",
-                        "endpoint": f"/tools/{tool_name}",
-                    }
-                    for tool_name in known_tools
-                ]
-            }
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    async def list_tools(request: Request):
+        """List all available MCP tools with their JSON input schemas."""
+        return {"tools": [tool.describe() for tool in request.app.state.tools.values()]}
     
     @app.post("/tools/{tool_name}")
     async def call_tool(tool_name: str, request: Request):
         """Call an MCP tool by name.
         
+        Paginated tools stream one NDJSON line per upstream page when the
+        request sends ``Accept: application/x-ndjson`` or ``"stream": true``.
+        
         Args:
             tool_name: Name of the tool to call
             request: FastAPI request object containing JSON body with tool parameters
@@ -92,79 +241,105 @@ def create_http_app(mcp_server) -> FastAPI:
         """
         try:
             body = await request.json()
+            stream = _wants_stream(request, body)
+            tool, tool_params = _resolve_call(request, tool_name, body)
             
-            # Extract api_key and tenant_id from body or headers
-            api_key = body.get("api_key") or request.headers.get("X-API-Key")
-            tenant_id = body.get("tenant_id") or request.headers.get("X-Tenant-ID")
-            
-            if not api_key:
-                raise HTTPException(
-                    status_code=400,
-                    detail="api_key is required (provide in request body or X-API-Key header)"
-                )
-            
-            # Remove api_key and tenant_id from body to pass remaining params to tool
-            tool_params = {k: v for k, v in body.items() if k not in ["api_key", "tenant_id"]}
-            if tenant_id:
-                tool_params["tenant_id"] = tenant_id
-            
-            # Import and call tools directly
-            from src.tools import (
-                get_hosts,
-                get_host_details,
-                query_detections as query_detections_func,
-                get_detection_details as get_detection_details_func,
-                update_detections,
-                query_iocs as query_iocs_func,
-                create_ioc as create_ioc_func,
-                delete_ioc as delete_ioc_func,
-                query_host_groups as query_host_groups_func,
-                get_host_group_details as get_host_group_details_func,
-                query_prevention_policies as query_prevention_policies_func,
-                get_prevention_policy_details as get_prevention_policy_details_func,
-                query_sensor_update_policies as query_sensor_update_policies_func,
-                get_sensor_update_policy_details as get_sensor_update_policy_details_func,
-            )
+            if stream:
+                return await _stream_tool(tool, tool_params)
             
-            tool_func_map = {
-                "query_hosts": get_hosts,
-                "get_host_details": get_host_details,
-                "query_detections": query_detections_func,
-                "get_detection_details": get_detection_details_func,
-                "update_detection_status": update_detections,
-                "query_iocs": query_iocs_func,
-                "create_ioc": create_ioc_func,
-                "delete_ioc": delete_ioc_func,
-                "query_host_groups": query_host_groups_func,
-                "get_host_group_details": get_host_group_details_func,
-                "query_prevention_policies": query_prevention_policies_func,
-                "get_prevention_policy_details": get_prevention_policy_details_func,
-                "query_sensor_update_policies": query_sensor_update_policies_func,
-                "get_sensor_update_policy_details": get_sensor_update_policy_details_func,
-            }
-            
-            if tool_name not in tool_func_map:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Tool '{tool_name}' not found. Available tools: {list(tool_func_map.keys())}"
-                )
-            
-            tool_func = tool_func_map[tool_name]
-            
-            # Add api_key to params
-            tool_params["api_key"] = api_key
+            # Ask for the undecoded upstream body where the tool can pass it through
+            if tool.accepts_raw:
+                tool_params["raw"] = True
             
             # Call the tool function
-            result = await tool_func(**tool_params)
+            result = await tool.call(**tool_params)
             
-            return JSONResponse(content=result)
+            if isinstance(result, RawResponse):
+                return Response(content=result.content, media_type=result.media_type, status_code=result.status_code)
+            return CodecJSONResponse(content=result)
             
         except HTTPException:
             raise
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Tool execution error: {str(e)}")
+            raise _http_error(e)
+    
+    @app.post("/tools:batch")
+    async def call_tools_batch(request: Request):
+        """Call several MCP tools concurrently in one request.
+        
+        The body is a list of ``{"tool": ..., "arguments": {...}}`` items (or
+        an object with that list under ``calls``). Credentials may be given
+        per item, at the top level of the body or in the X-API-Key and
+        X-Tenant-ID headers. At most FALCON_BATCH_CONCURRENCY items run at
+        once; they share the pooled upstream connections and cached tokens.
+        
+        Args:
+            request: FastAPI request object containing the JSON batch
+            
+        Returns:
+            One result per item, in request order, each with its own status
+        """
+        body = await request.json()
+        calls = body.get("calls") if isinstance(body, dict) else body
+        if not isinstance(calls, list):
+            raise HTTPException(status_code=400, detail="Body must be a list of calls or an object with a 'calls' list")
+        max_calls = get_config()["BATCH_MAX_CALLS"]
+        if len(calls) > max_calls:
+            raise HTTPException(status_code=400, detail=f"A batch may contain at most {max_calls} calls")
+        
+        defaults = {k: body[k] for k in ("api_key", "tenant_id") if isinstance(body, dict) and body.get(k)}
+        semaphore = asyncio.Semaphore(get_config()["BATCH_CONCURRENCY"])
+        
+        async def run(call: Any) -> Dict[str, Any]:
+            tool_name = call.get("tool") if isinstance(call, dict) else None
+            try:
+                if not tool_name:
+                    raise HTTPException(status_code=400, detail="Each call needs a 'tool' name")
+                arguments = call.get("arguments") or {}
+                if not isinstance(arguments, dict):
+                    raise HTTPException(status_code=400, detail="'arguments' must be an object")
+                tool, tool_params = _resolve_call(request, tool_name, {**defaults, **arguments})
+                async with semaphore:
+                    result = await tool.call(**tool_params)
+                return {"tool": tool_name, "status": 200, "result": result}
+            except Exception as e:
+                error = e if isinstance(e, HTTPException) else _http_error(e)
+                return {"tool": tool_name, "status": error.status_code, "error": error.detail}
+        
+        return {"results": await asyncio.gather(*(run(call) for call in calls))}
     
     return app
 
+
+def create_app() -> FastAPI:
+    """Application factory for uvicorn worker processes."""
+    return create_http_app(mcp)
+
+
+def run_workers(host: str, port: int, workers: int) -> None:
+    """Serve the gateway from several worker processes.
+    
+    Workers share OAuth tokens and cached responses through the store in
+    FALCON_SHARED_STORE. When it is unset, a SQLite file in a private
+    temporary directory is used, so adding workers does not multiply token
+    mints or cache misses. The directory is removed when the workers exit.
+    
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        workers: Number of worker processes
+    """
+    import uvicorn
+    
+    directory = None
+    if not get_config()["SHARED_STORE"]:
+        # mkdtemp creates the directory readable by the current user only, so
+        # no other local user can read or plant the token database
+        directory = tempfile.mkdtemp(prefix="falcon-mcp-")
+        os.environ["FALCON_SHARED_STORE"] = os.path.join(directory, "shared.db")
+    logger.info("Starting %d gateway workers sharing %s", workers, os.environ["FALCON_SHARED_STORE"])
+    try:
+        uvicorn.run("src.http_gateway:create_app", factory=True, host=host, port=port, workers=workers)
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -1,25 +1,57 @@
 """MCP Server for CrowdStrike Falcon using FastMCP."""
-from fastmcp import FastMCP
-from config import get_transport_mode, get_config
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastmcp import FastMCP, Context
+from fastmcp.server.middleware import Middleware
+from config import get_mcp_transport, get_transport_mode, get_config
+from src.client import close_api_clients
+from src.metrics import start_metrics_server
+from src.tool_registry import observe_tool_call
 from src.tools import (
     get_hosts as get_hosts_tool,
     get_host_details as get_host_details_tool,
+    query_hosts_expanded as query_hosts_expanded_tool,
     query_detections as query_detections_tool,
     get_detection_details as get_detection_details_tool,
+    query_detections_expanded as query_detections_expanded_tool,
     update_detections as update_detections_tool,
     query_iocs as query_iocs_tool,
     create_ioc as create_ioc_tool,
+    create_iocs_bulk as create_iocs_bulk_tool,
     delete_ioc as delete_ioc_tool,
+    delete_iocs_bulk as delete_iocs_bulk_tool,
     query_host_groups as query_host_groups_tool,
     get_host_group_details as get_host_group_details_tool,
     query_prevention_policies as query_prevention_policies_tool,
     get_prevention_policy_details as get_prevention_policy_details_tool,
     query_sensor_update_policies as query_sensor_update_policies_tool,
     get_sensor_update_policy_details as get_sensor_update_policy_details_tool,
+    sync_host_inventory as sync_host_inventory_tool,
+    lookup_hosts as lookup_hosts_tool,
+    get_new_detections as get_new_detections_tool,
 )
 
+@asynccontextmanager
+async def lifespan(server):
+    """Close pooled upstream connections when the MCP server shuts down."""
+    try:
+        yield
+    finally:
+        await close_api_clients()
+
+
+class ToolMetricsMiddleware(Middleware):
+    """Record latency and errors of tool calls made over MCP."""
+    
+    async def on_call_tool(self, context, call_next):
+        with observe_tool_call(context.message.name, "mcp"):
+            return await call_next(context)
+
+
 # Create FastMCP server instance
-mcp = FastMCP("CrowdStrike Falcon MCP Server")
+mcp = FastMCP("CrowdStrike Falcon MCP Server", lifespan=lifespan)
+mcp.add_middleware(ToolMetricsMiddleware())
 
 
 # Host/Device Tools
@@ -31,6 +63,8 @@ async def query_hosts(
     limit: int = 100,
     offset: int = 0,
     sort: str | None = None,
+    fetch_all: bool = False,
+    max_results: int | None = None,
 ) -> dict:
     """Query hosts/devices in CrowdStrike Falcon.
     
@@ -38,14 +72,16 @@ async def query_hosts(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
         filter: FQL filter string (e.g., "hostname:'example.com'")
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order (e.g., "hostname.asc")
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
         
     Returns:
         Dictionary containing hosts data with resources, meta, and errors
     """
-    return await get_hosts_tool(api_key, tenant_id, filter, limit, offset, sort)
+    return await get_hosts_tool(api_key, tenant_id, filter, limit, offset, sort, fetch_all, max_results)
 
 
 @mcp.tool()
@@ -53,6 +89,7 @@ async def get_host_details(
     api_key: str,
     device_ids: list[str],
     tenant_id: str | None = None,
+    fields: list[str] | None = None,
 ) -> dict:
     """Get detailed information about specific hosts/devices.
     
@@ -60,11 +97,48 @@ async def get_host_details(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         device_ids: List of device IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["hostname", "device_policies.prevention.policy_id"])
         
     Returns:
         Dictionary containing detailed host information
     """
-    return await get_host_details_tool(api_key, device_ids, tenant_id)
+    return await get_host_details_tool(api_key, device_ids, tenant_id, fields)
+
+
+@mcp.tool()
+async def query_hosts_expanded(
+    api_key: str,
+    tenant_id: str | None = None,
+    filter: str | None = None,
+    limit: int = 100,
+    offset: int = 0,
+    sort: str | None = None,
+    fetch_all: bool = False,
+    max_results: int | None = None,
+    fields: list[str] | None = None,
+) -> dict:
+    """Query hosts/devices and return their full records in one call.
+    
+    Combines query_hosts and get_host_details: detail lookups for each page
+    of IDs overlap with the query for the next page.
+    
+    Args:
+        api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        filter: FQL filter string (e.g., "hostname:'example.com'")
+        limit: Maximum number of results per page (1-5000, default: 100)
+        offset: Offset for pagination (default: 0)
+        sort: Sort order (e.g., "hostname.asc")
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["hostname", "device_policies.prevention.policy_id"])
+        
+    Returns:
+        Dictionary containing full host records
+    """
+    return await query_hosts_expanded_tool(api_key, tenant_id, filter, limit, offset, sort, fetch_all, max_results, fields)
 
 
 # Detection Tools
@@ -76,6 +150,8 @@ async def query_detections(
     limit: int = 100,
     offset: int = 0,
     sort: str | None = None,
+    fetch_all: bool = False,
+    max_results: int | None = None,
 ) -> dict:
     """Query detections in CrowdStrike Falcon.
     
@@ -83,14 +159,16 @@ async def query_detections(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
         filter: FQL filter string (e.g., "status:'new'")
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
         
     Returns:
         Dictionary containing detections data
     """
-    return await query_detections_tool(api_key, tenant_id, filter, limit, offset, sort)
+    return await query_detections_tool(api_key, tenant_id, filter, limit, offset, sort, fetch_all, max_results)
 
 
 @mcp.tool()
@@ -98,6 +176,7 @@ async def get_detection_details(
     api_key: str,
     detection_ids: list[str],
     tenant_id: str | None = None,
+    fields: list[str] | None = None,
 ) -> dict:
     """Get detailed information about specific detections.
     
@@ -105,11 +184,48 @@ async def get_detection_details(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         detection_ids: List of detection IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["detection_id", "status", "device.hostname"])
         
     Returns:
         Dictionary containing detailed detection information
     """
-    return await get_detection_details_tool(api_key, detection_ids, tenant_id)
+    return await get_detection_details_tool(api_key, detection_ids, tenant_id, fields)
+
+
+@mcp.tool()
+async def query_detections_expanded(
+    api_key: str,
+    tenant_id: str | None = None,
+    filter: str | None = None,
+    limit: int = 100,
+    offset: int = 0,
+    sort: str | None = None,
+    fetch_all: bool = False,
+    max_results: int | None = None,
+    fields: list[str] | None = None,
+) -> dict:
+    """Query detections and return their full summaries in one call.
+    
+    Combines query_detections and get_detection_details: detail lookups for each page
+    of IDs overlap with the query for the next page.
+    
+    Args:
+        api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        filter: FQL filter string (e.g., "status:'new'")
+        limit: Maximum number of results per page (1-5000, default: 100)
+        offset: Offset for pagination (default: 0)
+        sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["detection_id", "status", "device.hostname"])
+        
+    Returns:
+        Dictionary containing full detection summaries
+    """
+    return await query_detections_expanded_tool(api_key, tenant_id, filter, limit, offset, sort, fetch_all, max_results, fields)
 
 
 @mcp.tool()
@@ -137,6 +253,38 @@ async def update_detection_status(
     return await update_detections_tool(api_key, detection_ids, status, tenant_id, assigned_to_uuid, comment)
 
 
+@mcp.tool()
+async def get_new_detections(
+    api_key: str,
+    tenant_id: str | None = None,
+    cursor: str | None = None,
+    consumer: str = "default",
+    since: str | None = None,
+    limit: int = 500,
+    fields: list[str] | None = None,
+) -> dict:
+    """Get detections created or changed since the last call.
+    
+    Pass the cursor from the previous response to continue; without a
+    cursor, polling resumes from the consumer's durable checkpoint. Call
+    again while meta.has_more is true.
+    
+    Args:
+        api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        cursor: Cursor returned by a previous call
+        consumer: Name of the checkpoint to resume from and update (default: "default")
+        since: ISO 8601 start time used when there is neither a cursor nor a checkpoint
+        limit: Maximum number of detections to return (1-5000, default: 500)
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["detection_id", "status", "device.hostname"])
+        
+    Returns:
+        Dictionary containing new detection summaries, with the next cursor under meta
+    """
+    return await get_new_detections_tool(api_key, tenant_id, cursor, consumer, since, limit, fields)
+
+
 # IOC Tools
 @mcp.tool()
 async def query_iocs(
@@ -146,6 +294,8 @@ async def query_iocs(
     limit: int = 100,
     offset: int = 0,
     sort: str | None = None,
+    fetch_all: bool = False,
+    max_results: int | None = None,
 ) -> dict:
     """Query Indicators of Compromise (IOCs).
     
@@ -153,14 +303,16 @@ async def query_iocs(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
         
     Returns:
         Dictionary containing IOCs data
     """
-    return await query_iocs_tool(api_key, tenant_id, filter, limit, offset, sort)
+    return await query_iocs_tool(api_key, tenant_id, filter, limit, offset, sort, fetch_all, max_results)
 
 
 @mcp.tool()
@@ -201,6 +353,30 @@ async def create_ioc(
     )
 
 
+@mcp.tool()
+async def create_iocs_bulk(
+    api_key: str,
+    indicators: list[dict],
+    ctx: Context,
+    tenant_id: str | None = None,
+) -> dict:
+    """Create many Indicators of Compromise (IOCs) in batched requests.
+    
+    Indicators are submitted in batches of 200 with bounded concurrency;
+    progress is reported to the client after each batch.
+    
+    Args:
+        api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
+        indicators: List of IOCs, each with type, value, action, platforms and
+            optional severity, description, expiration, applied_globally, host_groups
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        
+    Returns:
+        Dictionary with created IOCs, per-indicator results and a summary
+    """
+    return await create_iocs_bulk_tool(api_key, indicators, tenant_id, ctx.report_progress)
+
+
 @mcp.tool()
 async def delete_ioc(
     api_key: str,
@@ -220,6 +396,29 @@ async def delete_ioc(
     return await delete_ioc_tool(api_key, ioc_ids, tenant_id)
 
 
+@mcp.tool()
+async def delete_iocs_bulk(
+    api_key: str,
+    ioc_ids: list[str],
+    ctx: Context,
+    tenant_id: str | None = None,
+) -> dict:
+    """Delete many Indicators of Compromise (IOCs) in batched requests.
+    
+    IDs are submitted in batches of 100 with bounded concurrency; progress
+    is reported to the client after each batch.
+    
+    Args:
+        api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
+        ioc_ids: List of IOC IDs to delete
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        
+    Returns:
+        Dictionary with per-ID results and a summary
+    """
+    return await delete_iocs_bulk_tool(api_key, ioc_ids, tenant_id, ctx.report_progress)
+
+
 # Host Group Tools
 @mcp.tool()
 async def query_host_groups(
@@ -229,6 +428,8 @@ async def query_host_groups(
     limit: int = 100,
     offset: int = 0,
     sort: str | None = None,
+    fetch_all: bool = False,
+    max_results: int | None = None,
 ) -> dict:
     """Query host groups.
     
@@ -236,14 +437,16 @@ async def query_host_groups(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
         
     Returns:
         Dictionary containing host groups data
     """
-    return await query_host_groups_tool(api_key, tenant_id, filter, limit, offset, sort)
+    return await query_host_groups_tool(api_key, tenant_id, filter, limit, offset, sort, fetch_all, max_results)
 
 
 @mcp.tool()
@@ -251,6 +454,7 @@ async def get_host_group_details(
     api_key: str,
     group_ids: list[str],
     tenant_id: str | None = None,
+    fields: list[str] | None = None,
 ) -> dict:
     """Get detailed information about specific host groups.
     
@@ -258,11 +462,13 @@ async def get_host_group_details(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         group_ids: List of host group IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["id", "name", "group_type"])
         
     Returns:
         Dictionary containing host group details
     """
-    return await get_host_group_details_tool(api_key, group_ids, tenant_id)
+    return await get_host_group_details_tool(api_key, group_ids, tenant_id, fields)
 
 
 # Prevention Policy Tools
@@ -274,6 +480,8 @@ async def query_prevention_policies(
     limit: int = 100,
     offset: int = 0,
     sort: str | None = None,
+    fetch_all: bool = False,
+    max_results: int | None = None,
 ) -> dict:
     """Query prevention policies.
     
@@ -281,14 +489,16 @@ async def query_prevention_policies(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
         
     Returns:
         Dictionary containing prevention policies data
     """
-    return await query_prevention_policies_tool(api_key, tenant_id, filter, limit, offset, sort)
+    return await query_prevention_policies_tool(api_key, tenant_id, filter, limit, offset, sort, fetch_all, max_results)
 
 
 @mcp.tool()
@@ -296,6 +506,7 @@ async def get_prevention_policy_details(
     api_key: str,
     policy_ids: list[str],
     tenant_id: str | None = None,
+    fields: list[str] | None = None,
 ) -> dict:
     """Get detailed information about specific prevention policies.
     
@@ -303,11 +514,13 @@ async def get_prevention_policy_details(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         policy_ids: List of prevention policy IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["id", "name", "enabled"])
         
     Returns:
         Dictionary containing prevention policy details
     """
-    return await get_prevention_policy_details_tool(api_key, policy_ids, tenant_id)
+    return await get_prevention_policy_details_tool(api_key, policy_ids, tenant_id, fields)
 
 
 # Sensor Update Policy Tools
@@ -319,6 +532,8 @@ async def query_sensor_update_policies(
     limit: int = 100,
     offset: int = 0,
     sort: str | None = None,
+    fetch_all: bool = False,
+    max_results: int | None = None,
 ) -> dict:
     """Query sensor update policies.
     
@@ -326,14 +541,16 @@ async def query_sensor_update_policies(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
         
     Returns:
         Dictionary containing sensor update policies data
     """
-    return await query_sensor_update_policies_tool(api_key, tenant_id, filter, limit, offset, sort)
+    return await query_sensor_update_policies_tool(api_key, tenant_id, filter, limit, offset, sort, fetch_all, max_results)
 
 
 @mcp.tool()
@@ -341,6 +558,7 @@ async def get_sensor_update_policy_details(
     api_key: str,
     policy_ids: list[str],
     tenant_id: str | None = None,
+    fields: list[str] | None = None,
 ) -> dict:
     """Get detailed information about specific sensor update policies.
     
@@ -348,47 +566,188 @@ async def get_sensor_update_policy_details(
         api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
         policy_ids: List of sensor update policy IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["id", "name", "settings.build"])
         
     Returns:
         Dictionary containing sensor update policy details
     """
-    return await get_sensor_update_policy_details_tool(api_key, policy_ids, tenant_id)
+    return await get_sensor_update_policy_details_tool(api_key, policy_ids, tenant_id, fields)
+
+
+# Host Inventory Tools
+@mcp.tool()
+async def sync_host_inventory(
+    api_key: str,
+    tenant_id: str | None = None,
+    full: bool = False,
+) -> dict:
+    """Synchronise the local host inventory used by lookup_hosts.
+    
+    The first sync downloads every device; later syncs only fetch devices
+    modified since the previous sync.
+    
+    Args:
+        api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        full: Force a full resync, which also drops devices removed from Falcon (default: False)
+        
+    Returns:
+        Dictionary describing the sync (mode, records synced, inventory size, watermark)
+    """
+    return await sync_host_inventory_tool(api_key, tenant_id, full)
+
+
+@mcp.tool()
+async def lookup_hosts(
+    api_key: str,
+    tenant_id: str | None = None,
+    hostname: str | None = None,
+    local_ip: str | None = None,
+    mac_address: str | None = None,
+    platform: str | None = None,
+    status: str | None = None,
+    fields: list[str] | None = None,
+) -> dict:
+    """Look up hosts by hostname, IP, MAC, platform or status from the local inventory.
+    
+    Much faster than query_hosts for exact lookups; the inventory is synced
+    on first use and kept fresh incrementally.
+    
+    Args:
+        api_key: CrowdStrike API key (or set FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or set FALCON_TENANT_ID env var)
+        hostname: Hostname (case-insensitive)
+        local_ip: Local IP address
+        mac_address: MAC address, with or without separators
+        platform: Platform name (e.g., "Windows", "Mac", "Linux")
+        status: Device status (e.g., "normal", "contained")
+        fields: Optional field paths to return for each record, dotted for
+            nested fields (e.g., ["hostname", "local_ip"])
+        
+    Returns:
+        Dictionary containing matching host records
+    """
+    return await lookup_hosts_tool(api_key, tenant_id, hostname, local_ip, mac_address, platform, status, fields)
+
+
+# Implementation behind each MCP tool, used by the HTTP gateway to call the
+# tools directly (with gateway-only options such as raw passthrough)
+TOOL_IMPLEMENTATIONS = {
+    "query_hosts": get_hosts_tool,
+    "get_host_details": get_host_details_tool,
+    "query_hosts_expanded": query_hosts_expanded_tool,
+    "query_detections": query_detections_tool,
+    "get_detection_details": get_detection_details_tool,
+    "query_detections_expanded": query_detections_expanded_tool,
+    "update_detection_status": update_detections_tool,
+    "get_new_detections": get_new_detections_tool,
+    "query_iocs": query_iocs_tool,
+    "create_ioc": create_ioc_tool,
+    "create_iocs_bulk": create_iocs_bulk_tool,
+    "delete_ioc": delete_ioc_tool,
+    "delete_iocs_bulk": delete_iocs_bulk_tool,
+    "query_host_groups": query_host_groups_tool,
+    "get_host_group_details": get_host_group_details_tool,
+    "query_prevention_policies": query_prevention_policies_tool,
+    "get_prevention_policy_details": get_prevention_policy_details_tool,
+    "query_sensor_update_policies": query_sensor_update_policies_tool,
+    "get_sensor_update_policy_details": get_sensor_update_policy_details_tool,
+    "sync_host_inventory": sync_host_inventory_tool,
+    "lookup_hosts": lookup_hosts_tool,
+}
+
+
+async def serve_mcp(transport: str, port: int) -> None:
+    """Serve the MCP protocol over STDIO or over the network.
+    
+    Over ``streamable-http`` or ``sse`` one process serves any number of
+    concurrent MCP sessions, all sharing the pooled upstream connections,
+    token cache, response cache and in-flight request coalescing.
+    
+    Args:
+        transport: ``stdio``, ``streamable-http`` or ``sse``
+        port: Port for the network transports
+    """
+    if transport == "stdio":
+        await mcp.run_stdio_async()
+        return
+    await mcp.run_http_async(
+        transport=transport,
+        host="0.0.0.0",
+        port=port,
+        path=get_config()["MCP_PATH"] or None,
+    )
+
+
+async def run_dual(http_port: int, mcp_transport: str = "stdio", mcp_port: int = 8080) -> None:
+    """Serve MCP and HTTP as tasks on one event loop.
+    
+    Both transports share the same pooled upstream connections, token cache,
+    response cache and in-flight request coalescing. Over STDIO the HTTP
+    server is shut down when the STDIO session ends.
+    
+    Args:
+        http_port: Port for the HTTP/REST gateway
+        mcp_transport: Transport for the MCP protocol (see serve_mcp)
+        mcp_port: Port for the network MCP transports
+    """
+    import uvicorn
+    from src.http_gateway import create_http_app
+    
+    server = uvicorn.Server(
+        uvicorn.Config(create_http_app(mcp), host="0.0.0.0", port=http_port, log_level="info")
+    )
+    http_task = asyncio.create_task(server.serve())
+    if mcp_transport != "stdio":
+        # Both uvicorn servers install signal handlers; starting the MCP one
+        # second lets them unwind in order so each shuts down gracefully
+        while not server.started and not http_task.done():
+            await asyncio.sleep(0.05)
+    try:
+        await serve_mcp(mcp_transport, mcp_port)
+    finally:
+        server.should_exit = True
+        await http_task
 
 
 # Main entry point
 if __name__ == "__main__":
     transport_mode = get_transport_mode()
+    mcp_transport = get_mcp_transport()
+    
+    if get_config()["METRICS_PORT"]:
+        # Sidecar metrics port, e.g. for STDIO-only mode where there is no gateway
+        start_metrics_server(get_config()["METRICS_PORT"])
     
     if transport_mode == "stdio":
-        # STDIO mode only
-        mcp.run()
+        # MCP only, over STDIO or a network transport on STDIO_PORT
+        if mcp_transport == "stdio":
+            mcp.run()
+        else:
+            try:
+                asyncio.run(serve_mcp(mcp_transport, get_config()["STDIO_PORT"]))
+            except KeyboardInterrupt:
+                pass
     elif transport_mode == "http":
         # HTTP mode only - will be handled by http_gateway.py
-        from src.http_gateway import create_http_app
+        from src.http_gateway import create_http_app, run_workers
         import uvicorn
         config = get_config()
-        app = create_http_app(mcp)
-        uvicorn.run(app, host="0.0.0.0", port=config["HTTP_PORT"])
+        if config["HTTP_WORKERS"] > 1:
+            run_workers("0.0.0.0", config["HTTP_PORT"], config["HTTP_WORKERS"])
+        else:
+            app = create_http_app(mcp)
+            uvicorn.run(app, host="0.0.0.0", port=config["HTTP_PORT"])
     else:  # dual mode
-        # Run both STDIO and HTTP
-        # Note: In dual mode, you typically run STDIO in one process/container
-        # and HTTP in another, or use a process manager like supervisord
-        # For simplicity, we'll run HTTP in a background thread
-        import uvicorn
-        from src.http_gateway import create_http_app
-        import threading
-        
         config = get_config()
+        if config["HTTP_WORKERS"] > 1:
+            logging.getLogger(__name__).warning(
+                "FALCON_HTTP_WORKERS only applies to TRANSPORT_MODE=http; serving HTTP from one process"
+            )
         
-        def run_http():
-            """Run HTTP server in background thread."""
-            app = create_http_app(mcp)
-            uvicorn.run(app, host="0.0.0.0", port=config["HTTP_PORT"], log_level="info")
-        
-        # Start HTTP server in background thread
-        http_thread = threading.Thread(target=run_http, daemon=True)
-        http_thread.start()
-        
-        # Run STDIO server in main thread
-        mcp.run()
-
+        # Run MCP and HTTP on the main thread's event loop
+        try:
+            asyncio.run(run_dual(config["HTTP_PORT"], mcp_transport, config["STDIO_PORT"]))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,11 @@
+"""Local synchronisation of CrowdStrike Falcon data."""
+from .detections import CheckpointStore, DetectionWatermark
+from .inventory import HostInventory, get_inventory, INDEXED_FIELDS
+
+__all__ = [
+    "CheckpointStore",
+    "DetectionWatermark",
+    "HostInventory",
+    "get_inventory",
+    "INDEXED_FIELDS",
+]
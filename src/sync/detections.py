@@ -0,0 +1,116 @@
+"""Incremental detection sync with durable watermark checkpoints."""
+import base64
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class DetectionWatermark:
+    """Position in the stream of detection updates.
+
+    ``timestamp`` is the newest ``date_updated`` delivered so far and
+    ``seen_ids`` holds the detections delivered at exactly that timestamp,
+    so a ``>=`` query can resume without repeating or skipping records.
+    """
+
+    def __init__(self, timestamp: Optional[str] = None, seen_ids: Optional[Iterable[str]] = None):
+        self.timestamp = timestamp
+        self.seen_ids: Set[str] = set(seen_ids or ())
+
+    def is_new(self, detection: Dict[str, Any]) -> bool:
+        """Return True if the detection was changed after this watermark."""
+        updated = detection.get("date_updated")
+        if self.timestamp is None or updated is None:
+            return True
+        if updated > self.timestamp:
+            return True
+        return updated == self.timestamp and detection.get("detection_id") not in self.seen_ids
+
+    def advanced(self, detections: List[Dict[str, Any]]) -> "DetectionWatermark":
+        """Return the watermark after delivering detections."""
+        timestamp = self.timestamp
+        seen = set(self.seen_ids)
+        for detection in detections:
+            updated = detection.get("date_updated")
+            if updated is None:
+                continue
+            if timestamp is None or updated > timestamp:
+                timestamp = updated
+                seen = set()
+            if updated == timestamp:
+                seen.add(detection.get("detection_id"))
+        return DetectionWatermark(timestamp, seen)
+
+    def encode(self) -> str:
+        """Encode the watermark as an opaque cursor string."""
+        payload = json.dumps({"ts": self.timestamp, "ids": sorted(self.seen_ids)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "DetectionWatermark":
+        """Decode a cursor produced by encode()."""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return cls(payload.get("ts"), payload.get("ids"))
+        except (ValueError, TypeError, AttributeError):
+            raise ValueError("Invalid detection cursor")
+
+
+class CheckpointStore:
+    """JSON file mapping consumer keys to cursors, written atomically."""
+
+    def __init__(self, path: str):
+        """Initialize the store.
+
+        Args:
+            path: Checkpoint file location
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self, key: str) -> Optional[str]:
+        """Return the stored cursor for key, if any."""
+        with self._lock:
+            return self._read().get(key)
+
+    def save(self, key: str, cursor: str) -> None:
+        """Store the cursor for key, replacing the file atomically."""
+        with self._lock:
+            checkpoints = self._read()
+            checkpoints[key] = cursor
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+            try:
+                with os.fdopen(fd, "w") as tmp:
+                    json.dump(checkpoints, tmp)
+                    tmp.flush()
+                    os.fsync(tmp.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path) as checkpoint_file:
+                return json.load(checkpoint_file)
+        except FileNotFoundError:
+            return {}
+
+
+def select_new(
+    detections: List[Dict[str, Any]],
+    watermark: DetectionWatermark,
+    limit: int,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Return up to limit detections newer than watermark, oldest first.
+
+    Returns:
+        Tuple of (new detections, whether more new detections were available)
+    """
+    fresh = [detection for detection in detections if watermark.is_new(detection)]
+    fresh.sort(key=lambda detection: (detection.get("date_updated") or "", detection.get("detection_id") or ""))
+    return fresh[:limit], len(fresh) > limit
@@ -0,0 +1,206 @@
+"""Local host inventory with incremental sync for CrowdStrike Falcon."""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from config import get_config
+
+# Device fields with a secondary index, and how their values are normalised
+INDEXED_FIELDS = ("hostname", "local_ip", "mac_address", "platform_name", "status")
+
+
+def normalize(field: str, value: Any) -> str:
+    """Normalise a field value for index lookups."""
+    text = str(value).strip().lower()
+    if field == "mac_address":
+        text = text.replace(":", "").replace("-", "").replace(".", "")
+    return text
+
+
+class HostInventory:
+    """In-memory device store for one tenant, optionally persisted to SQLite.
+
+    Records are keyed by ``device_id`` with secondary indexes on
+    INDEXED_FIELDS. The newest ``modified_timestamp`` of the last completed
+    sync is kept as the watermark for incremental syncs; a sync that fails
+    part way leaves it unchanged, so the next sync fetches the rest again.
+    """
+
+    def __init__(self, tenant: str, db_path: Optional[str] = None):
+        """Initialize the inventory.
+
+        Args:
+            tenant: Identifier of the credential/tenant the inventory belongs to
+            db_path: Optional SQLite file used to persist records across restarts
+        """
+        self.tenant = tenant
+        self.db_path = db_path
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.indexes: Dict[str, Dict[str, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        self.watermark: Optional[str] = None
+        self.last_sync: Optional[float] = None
+        self._lock = threading.Lock()
+        if db_path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace device records and update the indexes.
+
+        Returns:
+            Number of records stored
+        """
+        count = 0
+        with self._lock:
+            for record in records:
+                device_id = record.get("device_id")
+                if not device_id:
+                    continue
+                self._unindex(device_id)
+                self.records[device_id] = record
+                for field in INDEXED_FIELDS:
+                    if record.get(field):
+                        self.indexes[field].setdefault(normalize(field, record[field]), set()).add(device_id)
+                count += 1
+        return count
+
+    def clear(self) -> None:
+        """Drop every record and the watermark."""
+        with self._lock:
+            self.records.clear()
+            self.indexes = {field: {} for field in INDEXED_FIELDS}
+            self.watermark = None
+
+    def lookup(self, **criteria: Optional[str]) -> List[Dict[str, Any]]:
+        """Return records matching every given field exactly (case-insensitive).
+
+        Args:
+            criteria: Values for any of INDEXED_FIELDS; None values are ignored
+
+        Returns:
+            Matching device records
+        """
+        with self._lock:
+            matches: Optional[Set[str]] = None
+            for field, value in criteria.items():
+                if value is None:
+                    continue
+                if field not in self.indexes:
+                    raise ValueError(f"Unknown inventory field: {field}")
+                ids = self.indexes[field].get(normalize(field, value), set())
+                matches = set(ids) if matches is None else matches & ids
+                if not matches:
+                    return []
+            device_ids = self.records.keys() if matches is None else matches
+            return [self.records[device_id] for device_id in sorted(device_ids)]
+
+    async def apply(self, pages: AsyncIterator[Dict[str, Any]], full: bool = False) -> int:
+        """Apply a stream of device detail responses from a sync.
+
+        Args:
+            pages: API responses whose resources are full device records
+            full: Whether this is a full sync replacing the current contents
+
+        Records of an incremental sync are stored as their pages arrive, but
+        the watermark only moves once every page has been received.
+
+        Returns:
+            Number of records received
+        """
+        received: Dict[str, Dict[str, Any]] = {}
+        async for page in pages:
+            resources = [r for r in page.get("resources") or [] if r.get("device_id")]
+            if not full:
+                self.upsert(resources)
+            received.update((r["device_id"], r) for r in resources)
+        if full:
+            self.clear()
+            self.upsert(received.values())
+        with self._lock:
+            self.watermark = newest_modified(received.values(), self.watermark)
+        self.last_sync = time.time()
+        if self.db_path:
+            await asyncio.to_thread(self._save, list(received.values()), full)
+        return len(received)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and sync state."""
+        return {"size": len(self.records), "watermark": self.watermark, "last_sync": self.last_sync}
+
+    def _unindex(self, device_id: str) -> None:
+        """Remove a record from the indexes. Caller holds the lock."""
+        previous = self.records.get(device_id)
+        if previous is None:
+            return
+        for field in INDEXED_FIELDS:
+            if previous.get(field):
+                ids = self.indexes[field].get(normalize(field, previous[field]))
+                if ids:
+                    ids.discard(device_id)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS hosts ("
+            "tenant TEXT NOT NULL, device_id TEXT NOT NULL, record TEXT NOT NULL, "
+            "PRIMARY KEY (tenant, device_id))"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS inventory_state ("
+            "tenant TEXT PRIMARY KEY, watermark TEXT, last_sync REAL)"
+        )
+        return connection
+
+    def _load(self) -> None:
+        with closing(self._connect()) as connection, connection:
+            rows = connection.execute("SELECT record FROM hosts WHERE tenant = ?", (self.tenant,))
+            records = [json.loads(row[0]) for row in rows]
+            self.upsert(records)
+            state = connection.execute(
+                "SELECT watermark, last_sync FROM inventory_state WHERE tenant = ?", (self.tenant,)
+            ).fetchone()
+        self.watermark = state[0] if state and state[0] else newest_modified(records, None)
+        if state:
+            self.last_sync = state[1]
+
+    def _save(self, records: List[Dict[str, Any]], full: bool) -> None:
+        with closing(self._connect()) as connection, connection:
+            if full:
+                connection.execute("DELETE FROM hosts WHERE tenant = ?", (self.tenant,))
+            connection.executemany(
+                "INSERT OR REPLACE INTO hosts (tenant, device_id, record) VALUES (?, ?, ?)",
+                [(self.tenant, record["device_id"], json.dumps(record)) for record in records],
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO inventory_state (tenant, watermark, last_sync) VALUES (?, ?, ?)",
+                (self.tenant, self.watermark, self.last_sync),
+            )
+
+
+def newest_modified(records: Iterable[Dict[str, Any]], watermark: Optional[str]) -> Optional[str]:
+    """Return the newest ``modified_timestamp`` among records and watermark."""
+    for record in records:
+        modified = record.get("modified_timestamp")
+        if modified and (watermark is None or modified > watermark):
+            watermark = modified
+    return watermark
+
+
+_inventories: Dict[str, HostInventory] = {}
+_inventories_lock = threading.Lock()
+
+
+def get_inventory(tenant: str) -> HostInventory:
+    """Return the process-wide inventory for a tenant, loading it on first use."""
+    with _inventories_lock:
+        inventory = _inventories.get(tenant)
+        if inventory is None:
+            inventory = HostInventory(tenant, get_config()["INVENTORY_DB"] or None)
+            _inventories[tenant] = inventory
+        return inventory
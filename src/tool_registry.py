@@ -0,0 +1,154 @@
+"""Tool dispatch registry built from the FastMCP server's tools.
+
+The HTTP gateway serves exactly the tools registered on the MCP server. Each
+entry pairs the MCP tool's name, description and JSON schema with the
+implementation in ``src.tools`` and an argument validator compiled once from
+the MCP tool's signature.
+
+Calls made through either the MCP server or the gateway are timed and
+traced with observe_tool_call().
+"""
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Type, get_type_hints
+
+from fastmcp import Context
+from pydantic import BaseModel, ConfigDict, create_model
+
+from src import tracing
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TOOL_DURATION = REGISTRY.histogram(
+    "falcon_tool_call_duration_seconds",
+    "Tool call latency, by tool and transport (mcp or http).",
+    ("tool", "transport"),
+)
+TOOL_ERRORS = REGISTRY.counter(
+    "falcon_tool_errors",
+    "Tool calls that raised, by tool, transport and exception type.",
+    ("tool", "transport", "error"),
+)
+TOOL_CALLS_IN_FLIGHT = REGISTRY.gauge(
+    "falcon_tool_calls_in_flight",
+    "Tool calls in progress, by transport.",
+    ("transport",),
+)
+
+
+@contextmanager
+def observe_tool_call(tool: str, transport: str) -> Iterator[None]:
+    """Record the latency, outcome and concurrency of one tool call, and trace it."""
+    TOOL_CALLS_IN_FLIGHT.inc(transport=transport)
+    started = time.perf_counter()
+    try:
+        with tracing.span("tool", {"falcon.tool": tool, "falcon.transport": transport}):
+            yield
+    except BaseException as exc:
+        # FastMCP wraps tool exceptions; count the original type
+        TOOL_ERRORS.inc(tool=tool, transport=transport, error=type(exc.__cause__ or exc).__name__)
+        raise
+    finally:
+        TOOL_CALLS_IN_FLIGHT.dec(transport=transport)
+        TOOL_DURATION.observe(time.perf_counter() - started, tool=tool, transport=transport)
+
+
+class ToolEntry:
+    """A gateway-callable tool."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        parameters: Dict[str, Any],
+        fn: Callable[..., Any],
+        validator: Type[BaseModel],
+    ):
+        self.name = name
+        self.description = description
+        self.parameters = parameters
+        self.fn = fn
+        self.validator = validator
+        accepted = inspect.signature(fn).parameters
+        self.accepts_raw = "raw" in accepted
+        self.accepts_page_callback = "page_callback" in accepted
+
+    def validate(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate and coerce call arguments.
+
+        Only arguments that were given are returned, so the implementation's
+        own defaults still apply.
+
+        Raises:
+            ValidationError: If an argument is unknown, missing or of the wrong type
+        """
+        return self.validator.model_validate(arguments).model_dump(exclude_unset=True)
+
+    async def call(self, **arguments: Any) -> Any:
+        """Run the implementation, recording metrics for the call."""
+        with observe_tool_call(self.name, "http"):
+            return await self.fn(**arguments)
+
+    def describe(self) -> Dict[str, Any]:
+        """Return the tool's listing for /tools."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "endpoint": f"/tools/{self.name}",
+            "parameters": self.parameters,
+        }
+
+
+def compile_validator(name: str, fn: Callable[..., Any]) -> Type[BaseModel]:
+    """Build a pydantic model for a tool function's arguments.
+
+    Context parameters injected by FastMCP are not part of the arguments.
+    """
+    hints = get_type_hints(fn)
+    fields: Dict[str, Any] = {}
+    for param in inspect.signature(fn).parameters.values():
+        annotation = hints.get(param.name, Any)
+        if annotation is Context:
+            continue
+        default = ... if param.default is inspect.Parameter.empty else param.default
+        fields[param.name] = (annotation, default)
+    return create_model(f"{name}_arguments", __config__=ConfigDict(extra="forbid"), **fields)
+
+
+async def _list_mcp_tools(mcp_server: Any) -> List[Any]:
+    """Return the server's tool objects across FastMCP versions."""
+    if hasattr(mcp_server, "list_tools"):
+        return list(await mcp_server.list_tools())
+    return list((await mcp_server.get_tools()).values())
+
+
+async def build_tool_registry(
+    mcp_server: Any,
+    implementations: Mapping[str, Callable[..., Any]],
+) -> Dict[str, ToolEntry]:
+    """Build the gateway registry from the tools registered on mcp_server.
+
+    Args:
+        mcp_server: The FastMCP server instance
+        implementations: Implementation function for each MCP tool name
+
+    Returns:
+        Registry entries keyed by tool name
+    """
+    registry: Dict[str, ToolEntry] = {}
+    for tool in await _list_mcp_tools(mcp_server):
+        fn: Optional[Callable[..., Any]] = implementations.get(tool.name)
+        if fn is None:
+            logger.warning("MCP tool %s has no gateway implementation; not exposed over HTTP", tool.name)
+            continue
+        registry[tool.name] = ToolEntry(
+            name=tool.name,
+            description=tool.description or "",
+            parameters=tool.parameters,
+            fn=fn,
+            validator=compile_validator(tool.name, tool.fn),
+        )
+    return registry
@@ -3,35 +3,49 @@ from .common import validate_api_key
 from .crowdstrike_falcon_tools import (
     get_hosts,
     get_host_details,
+    query_hosts_expanded,
     query_detections,
     get_detection_details,
+    query_detections_expanded,
     update_detections,
     query_iocs,
     create_ioc,
+    create_iocs_bulk,
     delete_ioc,
+    delete_iocs_bulk,
     query_host_groups,
     get_host_group_details,
     query_prevention_policies,
     get_prevention_policy_details,
     query_sensor_update_policies,
     get_sensor_update_policy_details,
+    sync_host_inventory,
+    lookup_hosts,
+    get_new_detections,
 )
 
 __all__ = [
     "validate_api_key",
     "get_hosts",
     "get_host_details",
+    "query_hosts_expanded",
     "query_detections",
     "get_detection_details",
+    "query_detections_expanded",
     "update_detections",
     "query_iocs",
     "create_ioc",
+    "create_iocs_bulk",
     "delete_ioc",
+    "delete_iocs_bulk",
     "query_host_groups",
     "get_host_group_details",
     "query_prevention_policies",
     "get_prevention_policy_details",
     "query_sensor_update_policies",
     "get_sensor_update_policy_details",
+    "sync_host_inventory",
+    "lookup_hosts",
+    "get_new_detections",
 ]
 
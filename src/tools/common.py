@@ -1,4 +1,6 @@
 """Common utilities for CrowdStrike Falcon tools."""
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 
 def validate_api_key(api_key: str) -> bool:
@@ -16,3 +18,105 @@ def validate_api_key(api_key: str) -> bool:
     # Adjust this based on actual CrowdStrike API key format
     return len(api_key.strip()) >= 16
 
+
+
+class ResponseMerger:
+    """Incrementally merge several Falcon API responses into one.
+    
+    ``resources`` and ``errors`` are concatenated in the order responses are
+    added. ``meta.query_time`` is summed, the first ``trace_id`` is kept (all
+    of them are listed under ``trace_ids``) and the most recent
+    ``pagination`` block wins.
+    """
+    
+    def __init__(self):
+        self.resources: List[Any] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.meta: Dict[str, Any] = {}
+        self._trace_ids: List[str] = []
+    
+    def add(self, response: Dict[str, Any]) -> None:
+        """Merge a single API response."""
+        self.resources.extend(response.get("resources") or [])
+        self.errors.extend(response.get("errors") or [])
+        meta = response.get("meta") or {}
+        for key, value in meta.items():
+            if key == "query_time":
+                self.meta["query_time"] = self.meta.get("query_time", 0) + (value or 0)
+            elif key == "trace_id":
+                if value:
+                    self._trace_ids.append(value)
+                self.meta.setdefault("trace_id", value)
+            elif key == "pagination":
+                self.meta["pagination"] = value
+            else:
+                self.meta.setdefault(key, value)
+    
+    def result(self) -> Dict[str, Any]:
+        """Return the merged response."""
+        meta = dict(self.meta)
+        if len(self._trace_ids) > 1:
+            meta["trace_ids"] = list(self._trace_ids)
+        return {"meta": meta, "resources": self.resources, "errors": self.errors}
+
+
+
+# Nested field selection: field name -> sub-selection, or None for the whole value
+FieldTree = Dict[str, Optional["FieldTree"]]
+
+
+@lru_cache(maxsize=256)
+def compile_projection(fields: Tuple[str, ...]) -> Callable[[Any], Any]:
+    """Compile dotted field paths into a function that projects one record.
+    
+    Paths such as ``device_policies.prevention.policy_id`` select nested
+    fields; lists along the path are projected element by element. Missing
+    fields are skipped. Compiled projections are cached per field set, so
+    repeated calls with the same fields only pay for the copy.
+    
+    Args:
+        fields: Field paths to keep
+        
+    Returns:
+        Function mapping a record to a new record with only those fields
+    """
+    tree: FieldTree = {}
+    for path in fields:
+        node = tree
+        parts = [part for part in path.strip().split(".") if part]
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            if last or node.get(part, {}) is None:
+                if last:
+                    node[part] = None
+                break
+            node = node.setdefault(part, {})
+    
+    def project(value: Any, selection: FieldTree) -> Any:
+        if isinstance(value, list):
+            return [project(item, selection) for item in value]
+        if not isinstance(value, dict):
+            return value
+        projected = {}
+        for name, child in selection.items():
+            if name in value:
+                projected[name] = value[name] if child is None else project(value[name], child)
+        return projected
+    
+    return lambda record: project(record, tree)
+
+
+def project_response(response: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Return response with each resource projected down to fields.
+    
+    Args:
+        response: API response with a ``resources`` list
+        fields: Dotted field paths to keep; None or empty returns response unchanged
+        
+    Returns:
+        Shallow copy of response with projected resources
+    """
+    if not fields or not response.get("resources"):
+        return response
+    projection = compile_projection(tuple(fields))
+    return {**response, "resources": [projection(resource) for resource in response.get("resources") or []]}
@@ -1,8 +1,20 @@
 """Tools (API functions) for CrowdStrike Falcon MCP Server."""
+import asyncio
+import logging
 import os
-from typing import Optional, Dict, Any, List
-from ..client.api_client import APIClient
-from .common import validate_api_key
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Callable, Awaitable, AsyncIterator, Sequence, Tuple, Union
+from config import get_config
+from ..client.api_client import APIClient, RawResponse
+from ..client.batcher import MicroBatcher, mentions_id, restrict_errors
+from ..client.pool import get_api_client
+from ..client.singleflight import SingleFlight
+from ..sync.detections import CheckpointStore, DetectionWatermark, select_new
+from ..sync.inventory import HostInventory, get_inventory
+from .common import validate_api_key, ResponseMerger, project_response
+
+logger = logging.getLogger(__name__)
 
 
 def _get_api_key_from_env() -> Optional[str]:
@@ -15,6 +27,339 @@ def _get_tenant_id_from_env() -> Optional[str]:
     return os.getenv("FALCON_TENANT_ID") or os.getenv("CROWDSTRIKE_TENANT_ID")
 
 
+# Coroutine receiving each API response page as it arrives
+PageCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+async def _stream_pages(pages: AsyncIterator[Dict[str, Any]], page_callback: PageCallback) -> Dict[str, Any]:
+    """Hand each page to page_callback instead of merging them.
+    
+    Returns:
+        Response with no resources whose meta records how many were streamed
+    """
+    streamed = 0
+    async for page in pages:
+        await page_callback(page)
+        streamed += len(page.get("resources") or [])
+    return {"meta": {"streamed": streamed}, "resources": [], "errors": []}
+
+
+def _projected_callback(
+    page_callback: Optional[PageCallback],
+    fields: Optional[List[str]],
+) -> Optional[PageCallback]:
+    """Wrap page_callback so each page is projected down to fields first."""
+    if page_callback is None or not fields:
+        return page_callback
+    
+    async def callback(page: Dict[str, Any]) -> None:
+        await page_callback(project_response(page, fields))
+    
+    return callback
+
+
+async def _single_page(client: APIClient, endpoint: str, params: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """Yield a single GET response as a one-page stream."""
+    yield await client.get(endpoint, params=params)
+
+
+async def _query(
+    client: APIClient,
+    endpoint: str,
+    params: Dict[str, Any],
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    page_callback: Optional[PageCallback] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
+    """Run a query endpoint, optionally following pagination.
+    
+    In single-page mode this is a plain GET, whose body is returned
+    undecoded if raw is set. Otherwise pages are streamed from the client
+    and merged one at a time, so only the accumulated IDs are held in
+    memory. With a page_callback nothing is merged: each page is handed
+    over as soon as it arrives.
+    """
+    if not fetch_all and max_results is None:
+        if page_callback is not None:
+            return await _stream_pages(_single_page(client, endpoint, params), page_callback)
+        if raw:
+            return await client.get_raw(endpoint, params=params)
+        return await client.get(endpoint, params=params)
+    
+    pages = client.paginate(endpoint, params=params, max_results=max_results)
+    if page_callback is not None:
+        return await _stream_pages(pages, page_callback)
+    
+    merger = ResponseMerger()
+    async for page in pages:
+        merger.add(page)
+    return merger.result()
+
+
+# Entity endpoints: (IDs per request, ID field in resources, HTTP method).
+# GET endpoints carry IDs in the query string, so they are kept small enough
+# to stay well under URL length limits.
+ENTITY_ENDPOINTS: Dict[str, tuple] = {
+    "/devices/entities/devices/v2": (100, "device_id", "GET"),
+    "/detects/entities/summaries/GET/v1": (1000, "detection_id", "POST"),
+    "/devices/entities/host-groups/v1": (100, "id", "GET"),
+    "/policy/entities/prevention/v1": (100, "id", "GET"),
+    "/policy/entities/sensor-update/v2": (100, "id", "GET"),
+}
+
+
+# Small host lookups issued close together are merged into one request
+_host_batcher = MicroBatcher(
+    window=get_config()["BATCH_WINDOW_MS"] / 1000,
+    max_batch=ENTITY_ENDPOINTS["/devices/entities/devices/v2"][0],
+)
+
+
+async def _get_entities(
+    client: APIClient,
+    endpoint: str,
+    ids: List[str],
+    raw: bool = False,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> Union[Dict[str, Any], RawResponse]:
+    """Fetch entities by ID, fanning out over concurrent chunked requests.
+    
+    IDs are de-duplicated and split into endpoint-sized chunks which are
+    fetched concurrently, bounded by FALCON_MAX_CONCURRENCY. The responses
+    are merged into one and resources are returned in input order. If raw
+    is set and a single request suffices, its body is returned undecoded.
+    Callers running several fetches at once pass a shared semaphore so the
+    bound holds across all of them.
+    """
+    chunk_size, id_field, method = ENTITY_ENDPOINTS[endpoint]
+    ids = list(dict.fromkeys(ids))
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)] or [[]]
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_config()["MAX_CONCURRENCY"])
+    
+    async def fetch(chunk: List[str]) -> Dict[str, Any]:
+        async with semaphore:
+            if method == "POST":
+                return await client.post(endpoint, data={"ids": chunk})
+            return await client.get(endpoint, params={"ids": ",".join(chunk)})
+    
+    if len(chunks) == 1:
+        if raw and method == "POST":
+            return await client.post_raw(endpoint, data={"ids": chunks[0]})
+        if raw:
+            return await client.get_raw(endpoint, params={"ids": ",".join(chunks[0])})
+        return await fetch(chunks[0])
+    
+    tasks = [asyncio.ensure_future(fetch(chunk)) for chunk in chunks]
+    try:
+        responses = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    merger = ResponseMerger()
+    for response in responses:
+        merger.add(response)
+    order = {resource_id: index for index, resource_id in enumerate(ids)}
+    merger.resources.sort(key=lambda resource: order.get(resource.get(id_field), len(order)))
+    return merger.result()
+
+
+async def _iter_expanded(
+    client: APIClient,
+    query_endpoint: str,
+    entity_endpoint: str,
+    params: Dict[str, Any],
+    max_results: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Query IDs and expand them into full records in one pipeline.
+    
+    The detail fetch for each page of IDs is started as soon as the page
+    arrives, so it overlaps with the query for the next page. At most
+    FALCON_MAX_CONCURRENCY detail fetches are outstanding at once, and they
+    share one semaphore, so no more detail requests than that are in flight.
+    
+    Yields:
+        One response per query page, in page order: the page's detail
+        records, with the query page's meta and errors merged in
+    """
+    pending: List["asyncio.Future[Dict[str, Any]]"] = []
+    max_pending = get_config()["MAX_CONCURRENCY"]
+    semaphore = asyncio.Semaphore(max_pending)
+    
+    async def expand(page: Dict[str, Any]) -> Dict[str, Any]:
+        merger = ResponseMerger()
+        merger.add({"meta": page.get("meta"), "errors": page.get("errors")})
+        ids = page.get("resources") or []
+        if ids:
+            merger.add(await _get_entities(client, entity_endpoint, ids, semaphore=semaphore))
+        return merger.result()
+    
+    try:
+        async for page in client.paginate(query_endpoint, params=params, max_results=max_results):
+            pending.append(asyncio.ensure_future(expand(page)))
+            if len(pending) >= max_pending:
+                yield await pending.pop(0)
+        while pending:
+            yield await pending.pop(0)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _query_expanded(
+    client: APIClient,
+    query_endpoint: str,
+    entity_endpoint: str,
+    params: Dict[str, Any],
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    page_callback: Optional[PageCallback] = None,
+) -> Dict[str, Any]:
+    """Query IDs and merge their full records into a single response.
+    
+    With a page_callback the pipeline's responses are handed over as they
+    complete instead of being merged.
+    """
+    if not fetch_all and max_results is None:
+        max_results = params.get("limit") or 100
+    
+    responses = _iter_expanded(client, query_endpoint, entity_endpoint, params, max_results)
+    if page_callback is not None:
+        return await _stream_pages(responses, page_callback)
+    
+    merger = ResponseMerger()
+    async for response in responses:
+        merger.add(response)
+    return merger.result()
+
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+# Indicators per create request, IOC IDs per delete request and detection
+# IDs per update request
+IOC_CREATE_BATCH_SIZE = 200
+IOC_DELETE_BATCH_SIZE = 100
+DETECTION_UPDATE_BATCH_SIZE = 1000
+
+# Detection updates with the same payload issued close together are merged
+_detection_update_batcher = MicroBatcher(
+    window=get_config()["WRITE_COALESCE_MS"] / 1000,
+    max_batch=DETECTION_UPDATE_BATCH_SIZE,
+)
+
+
+async def _submit_chunks(
+    chunks: Sequence[List[Any]],
+    submit: Callable[[List[Any]], Awaitable[Dict[str, Any]]],
+    progress_callback: Optional[ProgressCallback] = None,
+    skipped: int = 0,
+) -> List[Tuple[List[Any], Union[Dict[str, Any], Exception]]]:
+    """Submit chunks concurrently, collecting each chunk's response or error.
+    
+    Unlike _get_entities, a failing chunk does not fail the others: its
+    exception is returned in place of the response. Concurrency is bounded
+    by FALCON_MAX_CONCURRENCY and progress_callback receives the number of
+    items processed so far after each chunk completes. Items rejected
+    before submission are passed as skipped; they count towards the total
+    and as processed from the start.
+    """
+    semaphore = asyncio.Semaphore(get_config()["MAX_CONCURRENCY"])
+    total = sum(len(chunk) for chunk in chunks) + skipped
+    processed = skipped
+    if progress_callback and skipped:
+        await progress_callback(processed, total)
+    
+    async def run(chunk: List[Any]) -> Union[Dict[str, Any], Exception]:
+        nonlocal processed
+        async with semaphore:
+            try:
+                result: Union[Dict[str, Any], Exception] = await submit(chunk)
+            except Exception as e:
+                result = e
+        processed += len(chunk)
+        if progress_callback:
+            await progress_callback(processed, total)
+        return result
+    
+    results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    return list(zip(chunks, results))
+
+
+def _error_for(item_id: str, errors: List[Dict[str, Any]]) -> Optional[str]:
+    """Return the message of the first error that mentions item_id."""
+    for error in errors:
+        if item_id and (error.get("id") == item_id or mentions_id(str(error.get("message", "")), item_id)):
+            return error.get("message") or str(error)
+    return None
+
+
+async def _update_detections_chunked(
+    client: APIClient,
+    detection_ids: List[str],
+    payload: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Apply one detection update to many IDs in concurrent chunks."""
+    detection_ids = list(dict.fromkeys(detection_ids))
+    
+    async def submit(chunk: List[str]) -> Dict[str, Any]:
+        return await client.post("/detects/entities/detects/v2", data={"ids": chunk, **payload})
+    
+    chunks = [
+        detection_ids[i:i + DETECTION_UPDATE_BATCH_SIZE]
+        for i in range(0, len(detection_ids), DETECTION_UPDATE_BATCH_SIZE)
+    ]
+    if len(chunks) == 1:
+        response = await submit(chunks[0])
+        submitted: List[Tuple[List[str], Union[Dict[str, Any], Exception]]] = [(chunks[0], response)]
+    else:
+        submitted = await _submit_chunks(chunks, submit)
+    
+    merger = ResponseMerger()
+    results = []
+    for chunk, response in submitted:
+        if isinstance(response, Exception):
+            results.extend({"id": detection_id, "status": "error", "error": str(response)} for detection_id in chunk)
+            continue
+        merger.add(response)
+        for detection_id in chunk:
+            error = _error_for(detection_id, response.get("errors") or [])
+            if error:
+                results.append({"id": detection_id, "status": "error", "error": error})
+            else:
+                results.append({"id": detection_id, "status": "updated"})
+    
+    merged = merger.result()
+    merged["results"] = results
+    merged["summary"] = _summarize(results, "updated")
+    return merged
+
+
+def _restrict_update_results(
+    response: Dict[str, Any],
+    ids: List[str],
+    batch_ids: Dict[str, None],
+) -> Dict[str, Any]:
+    """Restrict a coalesced detection update response to one caller's IDs."""
+    wanted = set(ids)
+    results = [result for result in response.get("results") or [] if result["id"] in wanted]
+    return {
+        "meta": dict(response.get("meta") or {}),
+        "resources": [resource for resource in response.get("resources") or [] if resource in wanted],
+        "errors": restrict_errors(response.get("errors") or [], ids, batch_ids),
+        "results": results,
+        "summary": _summarize(results, "updated"),
+    }
+
+
+def _summarize(results: List[Dict[str, Any]], success_status: str) -> Dict[str, int]:
+    """Count per-item results by outcome."""
+    succeeded = sum(1 for result in results if result and result["status"] == success_status)
+    return {"total": len(results), "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
 # Host/Device Tools
 async def get_hosts(
     api_key: str,
@@ -23,16 +368,26 @@ async def get_hosts(
     limit: Optional[int] = 100,
     offset: Optional[int] = 0,
     sort: Optional[str] = None,
-) -> Dict[str, Any]:
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    page_callback: Optional[PageCallback] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Query hosts/devices.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order (e.g., "hostname.asc")
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        page_callback: Optional coroutine receiving each response page as it
+            arrives; pages are then not merged into the return value
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing hosts data
@@ -47,34 +402,40 @@ async def get_hosts(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {}
-        if filter:
-            params["filter"] = filter
-        if limit:
-            params["limit"] = limit
-        if offset:
-            params["offset"] = offset
-        if sort:
-            params["sort"] = sort
-        
-        return await client.get("/devices/queries/devices/v1", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    params = {}
+    if filter:
+        params["filter"] = filter
+    if limit:
+        params["limit"] = limit
+    if offset:
+        params["offset"] = offset
+    if sort:
+        params["sort"] = sort
+    
+    return await _query(client, "/devices/queries/devices/v1", params, fetch_all, max_results, page_callback, raw)
 
 
 async def get_host_details(
     api_key: str,
     device_ids: List[str],
     tenant_id: Optional[str] = None,
-) -> Dict[str, Any]:
+    fields: Optional[List[str]] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Get detailed information about specific hosts.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         device_ids: List of device IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["hostname", "device_policies.prevention.policy_id"])
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway). Has
+            no effect on lookups merged by the micro-batcher, which are
+            always decoded; with batching enabled that is every lookup of
+            fewer than 100 IDs
         
     Returns:
         Dictionary containing host details
@@ -88,12 +449,74 @@ async def get_host_details(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {"ids": ",".join(device_ids)}
-        return await client.get("/devices/entities/devices/v2", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    endpoint = "/devices/entities/devices/v2"
+    if _host_batcher.window > 0 and len(device_ids) < _host_batcher.max_batch:
+        response = await _host_batcher.load(
+            (client.token_key, endpoint), device_ids,
+            lambda ids: _get_entities(client, endpoint, ids), "device_id"
+        )
+    else:
+        response = await _get_entities(client, endpoint, device_ids, raw=raw and not fields)
+    return project_response(response, fields)
+
+
+async def query_hosts_expanded(
+    api_key: str,
+    tenant_id: Optional[str] = None,
+    filter: Optional[str] = None,
+    limit: Optional[int] = 100,
+    offset: Optional[int] = 0,
+    sort: Optional[str] = None,
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    page_callback: Optional[PageCallback] = None,
+) -> Dict[str, Any]:
+    """Query hosts/devices and return their full records.
+    
+    Args:
+        api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        filter: FQL filter string
+        limit: Maximum number of results per page (1-5000, default: 100)
+        offset: Offset for pagination (default: 0)
+        sort: Sort order (e.g., "hostname.asc")
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["hostname", "device_policies.prevention.policy_id"])
+        page_callback: Optional coroutine receiving each response page as it
+            arrives; pages are then not merged into the return value
+        
+    Returns:
+        Dictionary containing full host records
+    """
+    api_key = api_key or _get_api_key_from_env()
+    tenant_id = tenant_id or _get_tenant_id_from_env()
+    
+    if not api_key:
+        raise ValueError("api_key is required (or set FALCON_API_KEY environment variable)")
+    
+    if not validate_api_key(api_key):
+        raise ValueError("Invalid API key format")
+    
+    client = get_api_client(api_key, tenant_id)
+    params = {}
+    if filter:
+        params["filter"] = filter
+    if limit:
+        params["limit"] = limit
+    if offset:
+        params["offset"] = offset
+    if sort:
+        params["sort"] = sort
+    
+    response = await _query_expanded(
+        client, "/devices/queries/devices/v1", "/devices/entities/devices/v2",
+        params, fetch_all, max_results, _projected_callback(page_callback, fields)
+    )
+    return project_response(response, fields)
 
 
 # Detection Tools
@@ -104,16 +527,26 @@ async def query_detections(
     limit: Optional[int] = 100,
     offset: Optional[int] = 0,
     sort: Optional[str] = None,
-) -> Dict[str, Any]:
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    page_callback: Optional[PageCallback] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Query detections.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        page_callback: Optional coroutine receiving each response page as it
+            arrives; pages are then not merged into the return value
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing detections data
@@ -127,34 +560,37 @@ async def query_detections(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {}
-        if filter:
-            params["filter"] = filter
-        if limit:
-            params["limit"] = limit
-        if offset:
-            params["offset"] = offset
-        if sort:
-            params["sort"] = sort
-        
-        return await client.get("/detects/queries/detects/v1", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    params = {}
+    if filter:
+        params["filter"] = filter
+    if limit:
+        params["limit"] = limit
+    if offset:
+        params["offset"] = offset
+    if sort:
+        params["sort"] = sort
+    
+    return await _query(client, "/detects/queries/detects/v1", params, fetch_all, max_results, page_callback, raw)
 
 
 async def get_detection_details(
     api_key: str,
     detection_ids: List[str],
     tenant_id: Optional[str] = None,
-) -> Dict[str, Any]:
+    fields: Optional[List[str]] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Get detailed information about specific detections.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         detection_ids: List of detection IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["detection_id", "status", "device.hostname"])
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing detection details
@@ -168,12 +604,69 @@ async def get_detection_details(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        data = {"ids": detection_ids}
-        return await client.post("/detects/entities/summaries/GET/v1", data=data)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    response = await _get_entities(
+        client, "/detects/entities/summaries/GET/v1", detection_ids, raw=raw and not fields
+    )
+    return project_response(response, fields)
+
+
+async def query_detections_expanded(
+    api_key: str,
+    tenant_id: Optional[str] = None,
+    filter: Optional[str] = None,
+    limit: Optional[int] = 100,
+    offset: Optional[int] = 0,
+    sort: Optional[str] = None,
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    page_callback: Optional[PageCallback] = None,
+) -> Dict[str, Any]:
+    """Query detections and return their full summaries.
+    
+    Args:
+        api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        filter: FQL filter string
+        limit: Maximum number of results per page (1-5000, default: 100)
+        offset: Offset for pagination (default: 0)
+        sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["detection_id", "status", "device.hostname"])
+        page_callback: Optional coroutine receiving each response page as it
+            arrives; pages are then not merged into the return value
+        
+    Returns:
+        Dictionary containing full detection summaries
+    """
+    api_key = api_key or _get_api_key_from_env()
+    tenant_id = tenant_id or _get_tenant_id_from_env()
+    
+    if not api_key:
+        raise ValueError("api_key is required (or set FALCON_API_KEY environment variable)")
+    
+    if not validate_api_key(api_key):
+        raise ValueError("Invalid API key format")
+    
+    client = get_api_client(api_key, tenant_id)
+    params = {}
+    if filter:
+        params["filter"] = filter
+    if limit:
+        params["limit"] = limit
+    if offset:
+        params["offset"] = offset
+    if sort:
+        params["sort"] = sort
+    
+    response = await _query_expanded(
+        client, "/detects/queries/detects/v1", "/detects/entities/summaries/GET/v1",
+        params, fetch_all, max_results, _projected_callback(page_callback, fields)
+    )
+    return project_response(response, fields)
 
 
 async def update_detections(
@@ -195,7 +688,12 @@ async def update_detections(
         comment: Optional comment to add
         
     Returns:
-        Dictionary containing update results
+        Dictionary containing update results, with per-ID outcomes under "results"
+        
+    Updates made at the same time with the same status, assignee and comment
+    are sent as one request. If that request is rejected with a 4xx status,
+    each caller resends its own IDs. Any other failure may leave the update
+    applied, so it is raised to every caller and nothing is resent.
     """
     api_key = api_key or _get_api_key_from_env()
     tenant_id = tenant_id or _get_tenant_id_from_env()
@@ -206,20 +704,25 @@ async def update_detections(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
+    client = get_api_client(api_key, tenant_id)
+    payload: Dict[str, Any] = {"status": status}
+    if assigned_to_uuid:
+        payload["assigned_to_uuid"] = assigned_to_uuid
+    if comment:
+        payload["comment"] = comment
+    
+    async def submit(ids: List[str]) -> Dict[str, Any]:
+        return await _update_detections_chunked(client, ids, payload)
+    
     try:
-        data = {
-            "ids": detection_ids,
-            "status": status,
-        }
-        if assigned_to_uuid:
-            data["assigned_to_uuid"] = assigned_to_uuid
-        if comment:
-            data["comment"] = comment
-        
-        return await client.post("/detects/entities/detects/v2", data=data)
+        if _detection_update_batcher.window > 0 and len(detection_ids) < _detection_update_batcher.max_batch:
+            return await _detection_update_batcher.load(
+                (client.token_key, status, assigned_to_uuid, comment), detection_ids, submit,
+                restrict=_restrict_update_results,
+            )
+        return await submit(detection_ids)
     finally:
-        await client.close()
+        await client.invalidate_cache("/detects/")
 
 
 # IOC Tools
@@ -230,16 +733,26 @@ async def query_iocs(
     limit: Optional[int] = 100,
     offset: Optional[int] = 0,
     sort: Optional[str] = None,
-) -> Dict[str, Any]:
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    page_callback: Optional[PageCallback] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Query Indicators of Compromise (IOCs).
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        page_callback: Optional coroutine receiving each response page as it
+            arrives; pages are then not merged into the return value
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing IOCs data
@@ -253,21 +766,18 @@ async def query_iocs(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {}
-        if filter:
-            params["filter"] = filter
-        if limit:
-            params["limit"] = limit
-        if offset:
-            params["offset"] = offset
-        if sort:
-            params["sort"] = sort
-        
-        return await client.get("/iocs/queries/indicators/v1", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    params = {}
+    if filter:
+        params["filter"] = filter
+    if limit:
+        params["limit"] = limit
+    if offset:
+        params["offset"] = offset
+    if sort:
+        params["sort"] = sort
+    
+    return await _query(client, "/iocs/queries/indicators/v1", params, fetch_all, max_results, page_callback, raw)
 
 
 async def create_ioc(
@@ -310,28 +820,123 @@ async def create_ioc(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
+    client = get_api_client(api_key, tenant_id)
+    data = {
+        "type": type,
+        "value": value,
+        "action": action,
+        "platforms": platforms,
+    }
+    if severity:
+        data["severity"] = severity
+    if description:
+        data["description"] = description
+    if expiration:
+        data["expiration"] = expiration
+    if applied_globally is not None:
+        data["applied_globally"] = applied_globally
+    if host_groups:
+        data["host_groups"] = host_groups
+    
     try:
-        data = {
-            "type": type,
-            "value": value,
-            "action": action,
-            "platforms": platforms,
-        }
-        if severity:
-            data["severity"] = severity
-        if description:
-            data["description"] = description
-        if expiration:
-            data["expiration"] = expiration
-        if applied_globally is not None:
-            data["applied_globally"] = applied_globally
-        if host_groups:
-            data["host_groups"] = host_groups
-        
         return await client.post("/iocs/entities/indicators/v1", data=data)
     finally:
-        await client.close()
+        await client.invalidate_cache("/iocs/")
+
+
+async def create_iocs_bulk(
+    api_key: str,
+    indicators: List[Dict[str, Any]],
+    tenant_id: Optional[str] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """Create many Indicators of Compromise (IOCs) in batched requests.
+    
+    Args:
+        api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
+        indicators: List of IOCs, each with the fields accepted by create_ioc
+            (type, value, action, platforms and optional extras)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        progress_callback: Optional coroutine called with (processed, total)
+            after each batch completes; total is the number of indicators
+            given, and indicators failing validation count as processed
+        
+    Returns:
+        Dictionary with created IOC resources, per-indicator results and a summary
+    """
+    api_key = api_key or _get_api_key_from_env()
+    tenant_id = tenant_id or _get_tenant_id_from_env()
+    
+    if not api_key:
+        raise ValueError("api_key is required (or set FALCON_API_KEY environment variable)")
+    
+    if not validate_api_key(api_key):
+        raise ValueError("Invalid API key format")
+    
+    client = get_api_client(api_key, tenant_id)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(indicators)
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+    for index, indicator in enumerate(indicators):
+        missing = [field for field in ("type", "value", "action", "platforms") if not indicator.get(field)]
+        if missing:
+            results[index] = {
+                "index": index,
+                "type": indicator.get("type"),
+                "value": indicator.get("value"),
+                "status": "error",
+                "error": f"Missing required fields: {', '.join(missing)}",
+            }
+        else:
+            valid.append((index, indicator))
+    
+    async def submit(chunk: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+        return await client.post(
+            "/iocs/entities/indicators/v1",
+            data={"indicators": [indicator for _, indicator in chunk]},
+        )
+    
+    chunks = [valid[i:i + IOC_CREATE_BATCH_SIZE] for i in range(0, len(valid), IOC_CREATE_BATCH_SIZE)]
+    merger = ResponseMerger()
+    try:
+        submitted = await _submit_chunks(chunks, submit, progress_callback, skipped=len(indicators) - len(valid))
+    finally:
+        await client.invalidate_cache("/iocs/")
+    
+    for chunk, response in submitted:
+        if isinstance(response, Exception):
+            for index, indicator in chunk:
+                results[index] = {
+                    "index": index,
+                    "type": indicator["type"],
+                    "value": indicator["value"],
+                    "status": "error",
+                    "error": str(response),
+                }
+            continue
+        merger.add(response)
+        created = {
+            (resource.get("type"), resource.get("value")): resource
+            for resource in response.get("resources") or []
+            if isinstance(resource, dict)
+        }
+        for index, indicator in chunk:
+            result: Dict[str, Any] = {"index": index, "type": indicator["type"], "value": indicator["value"]}
+            resource = created.get((indicator["type"], indicator["value"]))
+            if resource is not None and not resource.get("message"):
+                result.update(status="created", id=resource.get("id"))
+            else:
+                result.update(
+                    status="error",
+                    error=(resource or {}).get("message")
+                    or _error_for(indicator["value"], response.get("errors") or [])
+                    or "Indicator was not created",
+                )
+            results[index] = result
+    
+    merged = merger.result()
+    merged["results"] = results
+    merged["summary"] = _summarize(results, "created")
+    return merged
 
 
 async def delete_ioc(
@@ -358,12 +963,71 @@ async def delete_ioc(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
+    client = get_api_client(api_key, tenant_id)
+    params = {"ids": ",".join(ioc_ids)}
     try:
-        params = {"ids": ",".join(ioc_ids)}
         return await client.delete("/iocs/entities/indicators/v1", params=params)
     finally:
-        await client.close()
+        await client.invalidate_cache("/iocs/")
+
+
+async def delete_iocs_bulk(
+    api_key: str,
+    ioc_ids: List[str],
+    tenant_id: Optional[str] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """Delete many Indicators of Compromise (IOCs) in batched requests.
+    
+    Args:
+        api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
+        ioc_ids: List of IOC IDs to delete
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        progress_callback: Optional coroutine called with (processed, total)
+            after each batch completes
+        
+    Returns:
+        Dictionary with per-ID results and a summary
+    """
+    api_key = api_key or _get_api_key_from_env()
+    tenant_id = tenant_id or _get_tenant_id_from_env()
+    
+    if not api_key:
+        raise ValueError("api_key is required (or set FALCON_API_KEY environment variable)")
+    
+    if not validate_api_key(api_key):
+        raise ValueError("Invalid API key format")
+    
+    client = get_api_client(api_key, tenant_id)
+    ioc_ids = list(dict.fromkeys(ioc_ids))
+    
+    async def submit(chunk: List[str]) -> Dict[str, Any]:
+        return await client.delete("/iocs/entities/indicators/v1", params={"ids": ",".join(chunk)})
+    
+    chunks = [ioc_ids[i:i + IOC_DELETE_BATCH_SIZE] for i in range(0, len(ioc_ids), IOC_DELETE_BATCH_SIZE)]
+    merger = ResponseMerger()
+    try:
+        submitted = await _submit_chunks(chunks, submit, progress_callback)
+    finally:
+        await client.invalidate_cache("/iocs/")
+    
+    results = []
+    for chunk, response in submitted:
+        if isinstance(response, Exception):
+            results.extend({"id": ioc_id, "status": "error", "error": str(response)} for ioc_id in chunk)
+            continue
+        merger.add(response)
+        for ioc_id in chunk:
+            error = _error_for(ioc_id, response.get("errors") or [])
+            if error:
+                results.append({"id": ioc_id, "status": "error", "error": error})
+            else:
+                results.append({"id": ioc_id, "status": "deleted"})
+    
+    merged = merger.result()
+    merged["results"] = results
+    merged["summary"] = _summarize(results, "deleted")
+    return merged
 
 
 # Host Group Tools
@@ -374,16 +1038,26 @@ async def query_host_groups(
     limit: Optional[int] = 100,
     offset: Optional[int] = 0,
     sort: Optional[str] = None,
-) -> Dict[str, Any]:
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    page_callback: Optional[PageCallback] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Query host groups.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        page_callback: Optional coroutine receiving each response page as it
+            arrives; pages are then not merged into the return value
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing host groups data
@@ -397,34 +1071,37 @@ async def query_host_groups(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {}
-        if filter:
-            params["filter"] = filter
-        if limit:
-            params["limit"] = limit
-        if offset:
-            params["offset"] = offset
-        if sort:
-            params["sort"] = sort
-        
-        return await client.get("/devices/queries/host-groups/v1", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    params = {}
+    if filter:
+        params["filter"] = filter
+    if limit:
+        params["limit"] = limit
+    if offset:
+        params["offset"] = offset
+    if sort:
+        params["sort"] = sort
+    
+    return await _query(client, "/devices/queries/host-groups/v1", params, fetch_all, max_results, page_callback, raw)
 
 
 async def get_host_group_details(
     api_key: str,
     group_ids: List[str],
     tenant_id: Optional[str] = None,
-) -> Dict[str, Any]:
+    fields: Optional[List[str]] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Get detailed information about specific host groups.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         group_ids: List of host group IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["id", "name", "group_type"])
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing host group details
@@ -438,12 +1115,11 @@ async def get_host_group_details(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {"ids": ",".join(group_ids)}
-        return await client.get("/devices/entities/host-groups/v1", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    response = await _get_entities(
+        client, "/devices/entities/host-groups/v1", group_ids, raw=raw and not fields
+    )
+    return project_response(response, fields)
 
 
 # Prevention Policy Tools
@@ -454,16 +1130,26 @@ async def query_prevention_policies(
     limit: Optional[int] = 100,
     offset: Optional[int] = 0,
     sort: Optional[str] = None,
-) -> Dict[str, Any]:
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    page_callback: Optional[PageCallback] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Query prevention policies.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        page_callback: Optional coroutine receiving each response page as it
+            arrives; pages are then not merged into the return value
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing prevention policies data
@@ -477,34 +1163,37 @@ async def query_prevention_policies(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {}
-        if filter:
-            params["filter"] = filter
-        if limit:
-            params["limit"] = limit
-        if offset:
-            params["offset"] = offset
-        if sort:
-            params["sort"] = sort
-        
-        return await client.get("/policy/queries/prevention/v1", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    params = {}
+    if filter:
+        params["filter"] = filter
+    if limit:
+        params["limit"] = limit
+    if offset:
+        params["offset"] = offset
+    if sort:
+        params["sort"] = sort
+    
+    return await _query(client, "/policy/queries/prevention/v1", params, fetch_all, max_results, page_callback, raw)
 
 
 async def get_prevention_policy_details(
     api_key: str,
     policy_ids: List[str],
     tenant_id: Optional[str] = None,
-) -> Dict[str, Any]:
+    fields: Optional[List[str]] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Get detailed information about specific prevention policies.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         policy_ids: List of prevention policy IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["id", "name", "enabled"])
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing prevention policy details
@@ -518,12 +1207,11 @@ async def get_prevention_policy_details(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {"ids": ",".join(policy_ids)}
-        return await client.get("/policy/entities/prevention/v1", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    response = await _get_entities(
+        client, "/policy/entities/prevention/v1", policy_ids, raw=raw and not fields
+    )
+    return project_response(response, fields)
 
 
 # Sensor Update Policy Tools
@@ -534,16 +1222,26 @@ async def query_sensor_update_policies(
     limit: Optional[int] = 100,
     offset: Optional[int] = 0,
     sort: Optional[str] = None,
-) -> Dict[str, Any]:
+    fetch_all: bool = False,
+    max_results: Optional[int] = None,
+    page_callback: Optional[PageCallback] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Query sensor update policies.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
         filter: FQL filter string
-        limit: Maximum number of results (1-5000, default: 100)
+        limit: Maximum number of results per page (1-5000, default: 100)
         offset: Offset for pagination (default: 0)
         sort: Sort order
+        fetch_all: Follow pagination and return every matching result (default: False)
+        max_results: Optional cap on the total number of results; implies fetch_all
+        page_callback: Optional coroutine receiving each response page as it
+            arrives; pages are then not merged into the return value
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing sensor update policies data
@@ -557,34 +1255,37 @@ async def query_sensor_update_policies(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {}
-        if filter:
-            params["filter"] = filter
-        if limit:
-            params["limit"] = limit
-        if offset:
-            params["offset"] = offset
-        if sort:
-            params["sort"] = sort
-        
-        return await client.get("/policy/queries/sensor-update/v1", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    params = {}
+    if filter:
+        params["filter"] = filter
+    if limit:
+        params["limit"] = limit
+    if offset:
+        params["offset"] = offset
+    if sort:
+        params["sort"] = sort
+    
+    return await _query(client, "/policy/queries/sensor-update/v1", params, fetch_all, max_results, page_callback, raw)
 
 
 async def get_sensor_update_policy_details(
     api_key: str,
     policy_ids: List[str],
     tenant_id: Optional[str] = None,
-) -> Dict[str, Any]:
+    fields: Optional[List[str]] = None,
+    raw: bool = False,
+) -> Union[Dict[str, Any], RawResponse]:
     """Get detailed information about specific sensor update policies.
     
     Args:
         api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
         policy_ids: List of sensor update policy IDs to query
         tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["id", "name", "settings.build"])
+        raw: Return the upstream body undecoded, as a RawResponse, when it
+            needs no merging or projection (used by the HTTP gateway)
         
     Returns:
         Dictionary containing sensor update policy details
@@ -598,10 +1299,243 @@ async def get_sensor_update_policy_details(
     if not validate_api_key(api_key):
         raise ValueError("Invalid API key format")
     
-    client = APIClient(api_key, tenant_id)
-    try:
-        params = {"ids": ",".join(policy_ids)}
-        return await client.get("/policy/entities/sensor-update/v2", params=params)
-    finally:
-        await client.close()
+    client = get_api_client(api_key, tenant_id)
+    response = await _get_entities(
+        client, "/policy/entities/sensor-update/v2", policy_ids, raw=raw and not fields
+    )
+    return project_response(response, fields)
+
+
 
+# Host Inventory Tools
+_inventory_syncs = SingleFlight("inventory_sync")
+_background_syncs: set = set()
+
+
+def _tenant_id_for(client: APIClient) -> str:
+    """Identify a credential/tenant without exposing the client secret."""
+    client_id, secret_digest, tenant_id, base_url = client.token_key
+    return f"{client_id}|{secret_digest}|{tenant_id or ''}|{base_url}"
+
+
+async def _sync_inventory(client: APIClient, inventory: HostInventory, full: bool = False) -> Dict[str, Any]:
+    """Run a full or incremental inventory sync, coalescing concurrent syncs."""
+    full = full or inventory.watermark is None
+    
+    async def run() -> Dict[str, Any]:
+        params: Dict[str, Any] = {"limit": 5000}
+        if not full:
+            # >= refetches hosts modified in the watermark's second that a
+            # strict > would miss; upserting them again is harmless
+            params["filter"] = f"modified_timestamp:>='{inventory.watermark}'"
+        pages = _iter_expanded(
+            client, "/devices/queries/devices-scroll/v1", "/devices/entities/devices/v2", params
+        )
+        synced = await inventory.apply(pages, full=full)
+        return {"mode": "full" if full else "incremental", "synced": synced, **inventory.stats()}
+    
+    return await _inventory_syncs.do((inventory.tenant, full), run)
+
+
+def _refresh_inventory_in_background(client: APIClient, inventory: HostInventory) -> None:
+    """Start an incremental sync without waiting for it."""
+    async def run() -> None:
+        try:
+            await _sync_inventory(client, inventory)
+        except Exception:
+            logger.exception("Background host inventory sync failed")
+    
+    task = asyncio.ensure_future(run())
+    _background_syncs.add(task)
+    task.add_done_callback(_background_syncs.discard)
+
+
+async def sync_host_inventory(
+    api_key: str,
+    tenant_id: Optional[str] = None,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """Synchronise the local host inventory with Falcon.
+    
+    The first sync downloads every device; later syncs only fetch devices
+    whose modified_timestamp is at or after the inventory's watermark.
+    
+    Args:
+        api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        full: Force a full resync, which also drops devices removed from Falcon (default: False)
+        
+    Returns:
+        Dictionary describing the sync (mode, records synced, inventory size, watermark)
+    """
+    api_key = api_key or _get_api_key_from_env()
+    tenant_id = tenant_id or _get_tenant_id_from_env()
+    
+    if not api_key:
+        raise ValueError("api_key is required (or set FALCON_API_KEY environment variable)")
+    
+    if not validate_api_key(api_key):
+        raise ValueError("Invalid API key format")
+    
+    client = get_api_client(api_key, tenant_id)
+    inventory = get_inventory(_tenant_id_for(client))
+    return await _sync_inventory(client, inventory, full)
+
+
+async def lookup_hosts(
+    api_key: str,
+    tenant_id: Optional[str] = None,
+    hostname: Optional[str] = None,
+    local_ip: Optional[str] = None,
+    mac_address: Optional[str] = None,
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Look up hosts in the local inventory by exact field values.
+    
+    Lookups are served from memory. The inventory is synced on first use,
+    and refreshed incrementally in the background once it is older than
+    FALCON_INVENTORY_MAX_AGE seconds.
+    
+    Args:
+        api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        hostname: Hostname (case-insensitive)
+        local_ip: Local IP address
+        mac_address: MAC address, with or without separators
+        platform: Platform name (e.g., "Windows", "Mac", "Linux")
+        status: Device status (e.g., "normal", "contained")
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["hostname", "device_policies.prevention.policy_id"])
+        
+    Returns:
+        Dictionary containing matching host records
+    """
+    api_key = api_key or _get_api_key_from_env()
+    tenant_id = tenant_id or _get_tenant_id_from_env()
+    
+    if not api_key:
+        raise ValueError("api_key is required (or set FALCON_API_KEY environment variable)")
+    
+    if not validate_api_key(api_key):
+        raise ValueError("Invalid API key format")
+    
+    criteria = {
+        "hostname": hostname,
+        "local_ip": local_ip,
+        "mac_address": mac_address,
+        "platform_name": platform,
+        "status": status,
+    }
+    if all(value is None for value in criteria.values()):
+        raise ValueError("At least one of hostname, local_ip, mac_address, platform or status is required")
+    
+    client = get_api_client(api_key, tenant_id)
+    inventory = get_inventory(_tenant_id_for(client))
+    if inventory.last_sync is None:
+        await _sync_inventory(client, inventory)
+    elif time.time() - inventory.last_sync > get_config()["INVENTORY_MAX_AGE"]:
+        _refresh_inventory_in_background(client, inventory)
+    
+    resources = inventory.lookup(**criteria)
+    response = {"meta": {"inventory": inventory.stats()}, "resources": resources, "errors": []}
+    return project_response(response, fields)
+
+
+# Detection Sync Tools
+_detection_syncs = SingleFlight("detection_sync")
+_checkpoint_store: Optional[CheckpointStore] = None
+
+
+def _get_checkpoint_store() -> CheckpointStore:
+    """Return the process-wide detection checkpoint store."""
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CheckpointStore(get_config()["DETECTION_CHECKPOINT"])
+    return _checkpoint_store
+
+
+async def get_new_detections(
+    api_key: str,
+    tenant_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    consumer: str = "default",
+    since: Optional[str] = None,
+    limit: int = 500,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Get detections created or changed since a cursor.
+    
+    Each call returns the detections whose date_updated is newer than the
+    cursor, oldest first, together with the cursor to pass next time. When
+    no cursor is given, the last cursor returned to this consumer is read
+    from the durable checkpoint file, so polling resumes across restarts
+    without re-downloading history.
+    
+    Args:
+        api_key: CrowdStrike API key (or use FALCON_API_KEY env var)
+        tenant_id: Optional tenant ID for multi-tenant scenarios (or use FALCON_TENANT_ID env var)
+        cursor: Cursor returned by a previous call
+        consumer: Name of the checkpoint to resume from and update (default: "default")
+        since: ISO 8601 start time used when there is neither a cursor nor a
+            checkpoint (default: FALCON_DETECTION_LOOKBACK_HOURS ago)
+        limit: Maximum number of detections to return (1-5000, default: 500)
+        fields: Optional field paths to return for each record, with dots for
+            nested fields (e.g., ["detection_id", "status", "device.hostname"])
+        
+    Returns:
+        Dictionary containing new detection summaries, with the next cursor
+        and a has_more flag under meta
+    """
+    api_key = api_key or _get_api_key_from_env()
+    tenant_id = tenant_id or _get_tenant_id_from_env()
+    
+    if not api_key:
+        raise ValueError("api_key is required (or set FALCON_API_KEY environment variable)")
+    
+    if not validate_api_key(api_key):
+        raise ValueError("Invalid API key format")
+    
+    if not 1 <= limit <= 5000:
+        raise ValueError("limit must be between 1 and 5000")
+    
+    client = get_api_client(api_key, tenant_id)
+    store = _get_checkpoint_store()
+    checkpoint_key = f"{_tenant_id_for(client)}|{consumer}"
+    cursor = cursor or store.load(checkpoint_key)
+    if cursor:
+        watermark = DetectionWatermark.decode(cursor)
+    else:
+        lookback = timedelta(hours=get_config()["DETECTION_LOOKBACK_HOURS"])
+        start = since or (datetime.now(timezone.utc) - lookback).strftime("%Y-%m-%dT%H:%M:%SZ")
+        watermark = DetectionWatermark(start)
+    
+    async def run() -> Dict[str, Any]:
+        params = {
+            "filter": f"date_updated:>='{watermark.timestamp}'",
+            "sort": "date_updated.asc",
+            "limit": min(limit + len(watermark.seen_ids), 5000),
+        }
+        max_results = limit + len(watermark.seen_ids)
+        query = await _query(client, "/detects/queries/detects/v1", params, max_results=max_results)
+        ids = query.get("resources") or []
+        details = await _get_entities(client, "/detects/entities/summaries/GET/v1", ids) if ids else {}
+        
+        detections, truncated = select_new(details.get("resources") or [], watermark, limit)
+        total = ((query.get("meta") or {}).get("pagination") or {}).get("total")
+        next_watermark = watermark.advanced(detections)
+        next_cursor = next_watermark.encode()
+        await asyncio.to_thread(store.save, checkpoint_key, next_cursor)
+        return {
+            "meta": {
+                "cursor": next_cursor,
+                "watermark": next_watermark.timestamp,
+                "has_more": truncated or (total is not None and int(total) > len(ids)),
+            },
+            "resources": detections,
+            "errors": (query.get("errors") or []) + (details.get("errors") or []),
+        }
+    
+    response = await _detection_syncs.do((checkpoint_key, watermark.encode(), limit), run)
+    return project_response(response, fields)
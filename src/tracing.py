@@ -0,0 +1,139 @@
+"""Tracing hooks for tool calls and upstream API requests.
+
+Each phase of a call (tool, token, rate limiter wait, upstream request,
+JSON decode and encode) runs inside span(). By default spans are only
+timed when a request collects its timings (the HTTP gateway does this to
+emit a ``Server-Timing`` header) and cost almost nothing otherwise. Set
+FALCON_TRACING to ``otel`` to also export them through OpenTelemetry;
+this needs the ``opentelemetry-api`` package and a configured SDK.
+
+Spans covering an upstream response carry Falcon's trace ID as the
+``falcon.trace_id`` attribute.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - depends on the environment
+    otel_trace = None
+
+# Attribute holding Falcon's trace ID (X-Cs-Traceid / meta.trace_id)
+TRACE_ID_ATTRIBUTE = "falcon.trace_id"
+
+# Trace IDs listed in one Server-Timing header; paginated calls make many
+MAX_TRACE_IDS = 10
+
+
+def _select_tracer() -> Any:
+    requested = get_config()["TRACING"]
+    if requested != "otel":
+        return None
+    if otel_trace is None:
+        logger.warning("FALCON_TRACING=otel but opentelemetry-api is not installed; tracing disabled")
+        return None
+    return otel_trace.get_tracer("falcon-mcp")
+
+
+_tracer = _select_tracer()
+
+
+class Timings:
+    """Time spent in each phase while handling one request.
+
+    Durations of concurrent spans with the same name are summed, so a phase
+    can exceed the request's wall time when calls run in parallel.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.trace_ids: List[str] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def add_trace_id(self, trace_id: str) -> None:
+        if trace_id not in self.trace_ids and len(self.trace_ids) < MAX_TRACE_IDS:
+            self.trace_ids.append(trace_id)
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """Format the timings as a Server-Timing header value.
+
+        Args:
+            total: Optional wall time of the whole request, in seconds
+        """
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items()]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.1f}")
+        if self.trace_ids:
+            entries.append(f'falcon;desc="{" ".join(self.trace_ids)}"')
+        return ", ".join(entries)
+
+
+_timings: ContextVar[Optional[Timings]] = ContextVar("falcon_timings", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Timings]:
+    """Collect the timings of every span in this context, including tasks it starts."""
+    timings = Timings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+class _NoopSpan:
+    """Stand-in for an OpenTelemetry span when tracing is disabled."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """Trace one phase of a call.
+
+    Args:
+        name: Phase name, e.g. ``upstream``; exported as ``falcon.<name>``
+        attributes: Optional span attributes; None values are dropped
+
+    Yields:
+        The span, supporting set_attribute()
+    """
+    timings = _timings.get()
+    if _tracer is None and timings is None:
+        yield _NOOP_SPAN
+        return
+    started = time.perf_counter()
+    try:
+        if _tracer is None:
+            yield _NOOP_SPAN
+        else:
+            attributes = {key: value for key, value in (attributes or {}).items() if value is not None}
+            with _tracer.start_as_current_span(f"falcon.{name}", attributes=attributes) as current:
+                yield current
+    finally:
+        if timings is not None:
+            timings.add(name, time.perf_counter() - started)
+
+
+def record_trace_id(current: Any, trace_id: Optional[str]) -> None:
+    """Attach Falcon's trace ID to a span and to the collected timings."""
+    if not trace_id:
+        return
+    current.set_attribute(TRACE_ID_ATTRIBUTE, trace_id)
+    timings = _timings.get()
+    if timings is not None:
+        timings.add_trace_id(trace_id)
@@ -0,0 +1,45 @@
+"""Shared fixtures: APIClients backed by an httpx.MockTransport."""
+import uuid
+from typing import Callable, List
+
+import httpx
+import pytest
+
+from config import get_config
+from src.client.api_client import APIClient
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+def status_error(status_code: int) -> httpx.HTTPStatusError:
+    """Build the HTTPStatusError raise_for_status() raises for status_code."""
+    request = httpx.Request("GET", "https://api.crowdstrike.com/test")
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status_code}", request=request, response=response)
+
+
+@pytest.fixture
+def make_client() -> Callable[[Handler], APIClient]:
+    """Return a factory for APIClients whose requests are answered by handler.
+
+    Token requests are answered automatically. Each client gets a fresh
+    client_id, so tests never share tokens, rate limiters or cached data.
+    """
+    requests: List[httpx.Request] = []
+
+    def make(handler: Handler) -> APIClient:
+        def route(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/oauth2/token":
+                return httpx.Response(200, json={"access_token": "token", "expires_in": 1800})
+            requests.append(request)
+            return handler(request)
+
+        http_client = httpx.AsyncClient(
+            base_url=get_config()["API_BASE_URL"],
+            transport=httpx.MockTransport(route),
+        )
+        client = APIClient(f"{uuid.uuid4().hex}:secret", http_client=http_client)
+        client.requests = requests
+        return client
+
+    return make
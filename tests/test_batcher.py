@@ -0,0 +1,136 @@
+"""Tests for MicroBatcher merging, restriction and fallback rules."""
+import asyncio
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from src.client.batcher import MicroBatcher, is_rejection, mentions_id, restrict_errors
+
+from .conftest import status_error
+
+
+def make_fetch(sent: List[List[str]], error: Exception = None, reject: str = None):
+    """Return a fetcher recording each request's IDs.
+
+    IDs starting with ``x`` are reported as not found. The fetcher raises
+    error for every request, or a 400 for requests containing reject.
+    """
+    async def fetch(ids: List[str]) -> Dict[str, Any]:
+        sent.append(list(ids))
+        await asyncio.sleep(0)
+        if error is not None:
+            raise error
+        if reject is not None and reject in ids:
+            raise status_error(400)
+        return {
+            "meta": {"query_time": 0.1},
+            "resources": [{"id": item_id} for item_id in ids if not item_id.startswith("x")],
+            "errors": [{"code": 404, "message": f"{item_id} not found"} for item_id in ids if item_id.startswith("x")],
+        }
+    return fetch
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_share_one_request_and_are_restricted():
+    batcher = MicroBatcher(window=0.01)
+    sent: List[List[str]] = []
+    fetch = make_fetch(sent)
+
+    first, second = await asyncio.gather(
+        batcher.load("key", ["a1", "a2"], fetch),
+        batcher.load("key", ["x1"], fetch),
+    )
+
+    assert sent == [["a1", "a2", "x1"]]
+    assert first["resources"] == [{"id": "a1"}, {"id": "a2"}]
+    assert first["errors"] == []
+    assert second["resources"] == []
+    assert second["errors"] == [{"code": 404, "message": "x1 not found"}]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_split():
+    batcher = MicroBatcher(window=0.01, max_batch=2)
+    sent: List[List[str]] = []
+    fetch = make_fetch(sent)
+
+    await asyncio.gather(
+        batcher.load("key", ["a1"], fetch),
+        batcher.load("key", ["a2"], fetch),
+        batcher.load("key", ["a3"], fetch),
+    )
+
+    assert sent == [["a1", "a2"], ["a3"]]
+
+
+@pytest.mark.asyncio
+async def test_rejected_batch_is_resent_per_caller():
+    batcher = MicroBatcher(window=0.01)
+    sent: List[List[str]] = []
+    fetch = make_fetch(sent, reject="bad")
+
+    good, bad = await asyncio.gather(
+        batcher.load("key", ["good"], fetch),
+        batcher.load("key", ["bad"], fetch),
+        return_exceptions=True,
+    )
+
+    assert good["resources"] == [{"id": "good"}]
+    assert isinstance(bad, httpx.HTTPStatusError)
+    assert sorted(sent) == [["bad"], ["good"], ["good", "bad"]]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [
+    status_error(429),
+    status_error(503),
+    httpx.ReadTimeout("timed out"),
+    httpx.ConnectError("refused"),
+])
+async def test_other_failures_are_raised_to_every_caller(error):
+    batcher = MicroBatcher(window=0.01)
+    sent: List[List[str]] = []
+    fetch = make_fetch(sent, error=error)
+
+    results = await asyncio.gather(
+        batcher.load("key", ["a1"], fetch),
+        batcher.load("key", ["a2"], fetch),
+        return_exceptions=True,
+    )
+
+    assert sent == [["a1", "a2"]]
+    assert all(result is error for result in results)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (status_error(400), True),
+    (status_error(404), True),
+    (status_error(408), False),
+    (status_error(429), False),
+    (status_error(500), False),
+    (httpx.ReadTimeout("timed out"), False),
+    (ValueError("bad"), False),
+])
+def test_is_rejection(error, expected):
+    assert is_rejection(error) is expected
+
+
+def test_mentions_id_matches_whole_ids_only():
+    assert mentions_id("detection ldt:abc:12 not found", "ldt:abc:12")
+    assert mentions_id("not found: ldt:abc:12.", "ldt:abc:12")
+    assert not mentions_id("detection ldt:abc:123 not found", "ldt:abc:12")
+    assert not mentions_id("detection xldt:abc:12 not found", "ldt:abc:12")
+
+
+def test_restrict_errors_keeps_own_and_general_errors():
+    errors = [
+        {"message": "ldt:abc:123 not found"},
+        {"message": "ldt:abc:12 not found"},
+        {"message": "quota exceeded"},
+    ]
+    batch_ids = dict.fromkeys(["ldt:abc:12", "ldt:abc:123"])
+
+    kept = restrict_errors(errors, ["ldt:abc:12"], batch_ids)
+
+    assert kept == [{"message": "ldt:abc:12 not found"}, {"message": "quota exceeded"}]
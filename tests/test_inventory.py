@@ -0,0 +1,69 @@
+"""Tests for HostInventory syncs and the watermark."""
+from typing import Any, AsyncIterator, Dict, List
+
+import httpx
+import pytest
+
+from src.sync.inventory import HostInventory
+from src.tools.crowdstrike_falcon_tools import _sync_inventory
+
+pytestmark = pytest.mark.asyncio
+
+
+async def pages(*batches: List[Dict[str, Any]], fail: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    for batch in batches:
+        yield {"resources": batch}
+    if fail:
+        raise RuntimeError("sync failed")
+
+
+def host(device_id: str, modified: str) -> Dict[str, Any]:
+    return {"device_id": device_id, "hostname": device_id.upper(), "modified_timestamp": modified}
+
+
+async def test_completed_sync_sets_watermark_to_newest_record():
+    inventory = HostInventory("tenant")
+
+    await inventory.apply(pages([host("a", "2024-01-02T00:00:00Z")], [host("b", "2024-01-01T00:00:00Z")]), full=True)
+
+    assert inventory.watermark == "2024-01-02T00:00:00Z"
+    assert len(inventory) == 2
+
+
+async def test_failed_incremental_sync_keeps_watermark():
+    inventory = HostInventory("tenant")
+    await inventory.apply(pages([host("a", "2024-01-01T00:00:00Z")]), full=True)
+
+    with pytest.raises(RuntimeError):
+        await inventory.apply(pages([host("b", "2024-03-01T00:00:00Z")], fail=True))
+
+    assert inventory.watermark == "2024-01-01T00:00:00Z"
+    assert len(inventory) == 2
+
+
+async def test_failed_full_sync_keeps_contents():
+    inventory = HostInventory("tenant")
+    await inventory.apply(pages([host("a", "2024-01-01T00:00:00Z")]), full=True)
+
+    with pytest.raises(RuntimeError):
+        await inventory.apply(pages([host("b", "2024-03-01T00:00:00Z")], fail=True), full=True)
+
+    assert [record["device_id"] for record in inventory.lookup()] == ["a"]
+    assert inventory.watermark == "2024-01-01T00:00:00Z"
+
+
+async def test_incremental_sync_includes_the_watermark_second(make_client):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/devices/queries/"):
+            return httpx.Response(200, json={"meta": {"pagination": {"offset": "", "total": 1}}, "resources": ["b"]})
+        return httpx.Response(200, json={"meta": {}, "resources": [host("b", "2024-01-01T00:00:00Z")]})
+
+    client = make_client(handler)
+    inventory = HostInventory("tenant")
+    await inventory.apply(pages([host("a", "2024-01-01T00:00:00Z")]), full=True)
+
+    result = await _sync_inventory(client, inventory)
+
+    assert result["mode"] == "incremental"
+    assert client.requests[0].url.params["filter"] == "modified_timestamp:>='2024-01-01T00:00:00Z'"
+    assert len(inventory) == 2
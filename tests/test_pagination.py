@@ -0,0 +1,80 @@
+"""Tests for APIClient.paginate termination."""
+from typing import List
+
+import httpx
+import pytest
+
+pytestmark = pytest.mark.asyncio
+
+ENDPOINT = "/devices/queries/devices/v1"
+
+
+async def collect(client, **kwargs) -> List[List[str]]:
+    return [page["resources"] async for page in client.paginate(ENDPOINT, **kwargs)]
+
+
+async def test_after_token_is_followed_until_empty(make_client):
+    tokens = {None: "t1", "t1": "t2", "t2": ""}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        after = request.url.params.get("after")
+        pagination = {"after": tokens[after], "total": 3}
+        return httpx.Response(200, json={"meta": {"pagination": pagination}, "resources": [after or "first"]})
+
+    client = make_client(handler)
+
+    assert await collect(client, params={"limit": 1}) == [["first"], ["t1"], ["t2"]]
+    assert [request.url.params.get("after") for request in client.requests] == [None, "t1", "t2"]
+    assert all("offset" not in request.url.params for request in client.requests)
+
+
+async def test_numeric_offset_stops_at_total(make_client):
+    items = [f"id{i}" for i in range(5)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        offset = int(request.url.params.get("offset", 0))
+        limit = int(request.url.params["limit"])
+        page = items[offset:offset + limit]
+        pagination = {"offset": offset, "limit": limit, "total": len(items)}
+        return httpx.Response(200, json={"meta": {"pagination": pagination}, "resources": page})
+
+    client = make_client(handler)
+
+    assert await collect(client, params={"limit": 2}) == [["id0", "id1"], ["id2", "id3"], ["id4"]]
+    assert len(client.requests) == 3
+
+
+async def test_repeated_offset_token_stops(make_client):
+    def handler(request: httpx.Request) -> httpx.Response:
+        pagination = {"offset": "scroll-token", "expires_at": 0}
+        return httpx.Response(200, json={"meta": {"pagination": pagination}, "resources": ["id"]})
+
+    client = make_client(handler)
+
+    assert await collect(client, params={"limit": 1}) == [["id"], ["id"]]
+    assert [request.url.params.get("offset") for request in client.requests] == [None, "scroll-token"]
+
+
+async def test_empty_page_stops(make_client):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"meta": {"pagination": {"after": "more"}}, "resources": []})
+
+    client = make_client(handler)
+
+    assert await collect(client) == [[]]
+    assert len(client.requests) == 1
+
+
+async def test_max_results_caps_pages(make_client):
+    def handler(request: httpx.Request) -> httpx.Response:
+        offset = int(request.url.params.get("offset", 0))
+        page = [f"id{offset + i}" for i in range(10)]
+        pagination = {"offset": offset, "limit": 10, "total": 100}
+        return httpx.Response(200, json={"meta": {"pagination": pagination}, "resources": page})
+
+    client = make_client(handler)
+
+    pages = await collect(client, params={"limit": 10}, max_results=15)
+
+    assert sum(len(page) for page in pages) == 15
+    assert [request.url.params["limit"] for request in client.requests] == ["10", "5"]
@@ -0,0 +1,63 @@
+"""Tests for retry counting in APIClient._request and RetryPolicy."""
+import time
+from typing import List
+
+import httpx
+import pytest
+
+from src.client.retry import IDEMPOTENT, NON_IDEMPOTENT, SAFE, RetryPolicy
+
+ENDPOINT = "/devices/queries/devices/v1"
+
+
+def sequence_handler(statuses: List[int]):
+    """Answer requests with statuses in turn, then 200."""
+    remaining = list(statuses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status_code = remaining.pop(0) if remaining else 200
+        headers = {"X-RateLimit-RetryAfter": str(int(time.time()))} if status_code == 429 else {}
+        return httpx.Response(status_code, headers=headers, json={"meta": {}, "resources": ["ok"], "errors": []})
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_refresh_and_rate_limit_do_not_use_retry_budget(make_client):
+    client = make_client(sequence_handler([401, 429, 503]))
+
+    response = await client.get(ENDPOINT)
+
+    assert response["resources"] == ["ok"]
+    assert len(client.requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_after_max_attempts(make_client):
+    client = make_client(sequence_handler([503] * 10))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get(ENDPOINT)
+    assert len(client.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_writes_are_not_retried(make_client):
+    client = make_client(sequence_handler([503]))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.post("/detects/entities/detects/v2", data={"ids": ["ldt:a:1"]})
+    assert len(client.requests) == 1
+
+
+def test_backoff_respects_attempts_and_idempotency():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.1, deadline=30.0)
+
+    assert policy.backoff(SAFE, 1, 0.0, status_code=503) is not None
+    assert policy.backoff(SAFE, 3, 0.0, status_code=503) is None
+    assert policy.backoff(SAFE, 1, 0.0, status_code=404) is None
+    assert policy.backoff(IDEMPOTENT, 1, 0.0, status_code=500) is None
+    assert policy.backoff(NON_IDEMPOTENT, 1, 0.0, status_code=503) is None
+    assert policy.backoff(NON_IDEMPOTENT, 1, 0.0, error=httpx.ConnectError("refused")) is not None
+    assert policy.backoff(NON_IDEMPOTENT, 1, 0.0, error=httpx.ReadTimeout("timed out")) is None
+    assert policy.backoff(SAFE, 1, 31.0, status_code=503) is None
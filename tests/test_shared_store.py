@@ -0,0 +1,36 @@
+"""Tests for the SQLite shared store."""
+import time
+
+from src.client.shared_store import SQLiteStore
+
+
+def test_values_expire(tmp_path):
+    store = SQLiteStore(str(tmp_path / "shared.db"))
+
+    store.set("response", "key", b"value", 0.05)
+    assert store.get("response", "key") == b"value"
+    time.sleep(0.06)
+    assert store.get("response", "key") is None
+
+
+def test_lease_is_exclusive_until_released(tmp_path):
+    store = SQLiteStore(str(tmp_path / "shared.db"))
+
+    token = store.acquire_lease("token", "key", 10.0)
+    assert token
+    assert store.acquire_lease("token", "key", 10.0) is None
+
+    store.release_lease("token", "key", token)
+    assert store.acquire_lease("token", "key", 10.0)
+
+
+def test_expired_holder_cannot_release_new_lease(tmp_path):
+    store = SQLiteStore(str(tmp_path / "shared.db"))
+
+    stale = store.acquire_lease("token", "key", 0.05)
+    time.sleep(0.06)
+    current = store.acquire_lease("token", "key", 10.0)
+    assert current and current != stale
+
+    store.release_lease("token", "key", stale)
+    assert store.acquire_lease("token", "key", 10.0) is None
@@ -0,0 +1,81 @@
+"""Tests for SingleFlight coalescing."""
+import asyncio
+
+import pytest
+
+from src.client.singleflight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_concurrent_calls_share_one_call():
+    group = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": calls}
+
+    results = await asyncio.gather(*(group.do("key", fetch) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert group.in_flight() == 0
+
+
+async def test_different_keys_and_later_calls_run_separately():
+    group = SingleFlight()
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0)
+        return key
+
+    assert await asyncio.gather(group.do("a", lambda: fetch("a")), group.do("b", lambda: fetch("b"))) == ["a", "b"]
+    assert await group.do("a", lambda: fetch("a")) == "a"
+    assert calls == ["a", "b", "a"]
+
+
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    group = SingleFlight()
+    started = asyncio.Event()
+    finished = []
+
+    async def fetch():
+        started.set()
+        await asyncio.sleep(0.02)
+        finished.append(True)
+        return "done"
+
+    first = asyncio.ensure_future(group.do("key", fetch))
+    await started.wait()
+    second = asyncio.ensure_future(group.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
+    assert first.cancelled()
+    assert finished == [True]
+
+
+async def test_error_is_shared_and_not_cached():
+    group = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    results = await asyncio.gather(group.do("key", fetch), group.do("key", fetch), return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert group.in_flight() == 0
+
+    with pytest.raises(RuntimeError):
+        await group.do("key", fetch)
+    assert calls == 2